@@ -1,6 +1,7 @@
 """Configuration settings for the Graph Mapping Service."""
 
 import os
+from functools import cached_property
 from typing import Optional
 from pydantic_settings import BaseSettings
 
@@ -19,9 +20,11 @@ class Settings(BaseSettings):
     
     # Database Configuration
     database_url: str
-    database_pool_min_size: int = 5
-    database_pool_max_size: int = 10
+    database_pool_min_size: int = 10
+    database_pool_max_size: int = 50
     database_timeout: int = 30
+    database_statement_cache_size: int = 1024
+    database_max_inactive_connection_lifetime: float = 300.0
     
     # Etherscan API Configuration
     etherscan_api_key: str
@@ -29,16 +32,28 @@ class Settings(BaseSettings):
     etherscan_timeout: int = 30
     etherscan_retry_attempts: int = 3
     etherscan_retry_delay: float = 1.0
+    etherscan_requests_per_second: float = 5.0  # Free-tier API limit
+    etherscan_concurrency: int = 5  # Max node fetches in flight per traversal batch
+    etherscan_http2: bool = True
+    etherscan_max_connections: int = 100
+    etherscan_max_keepalive_connections: int = 50
+    etherscan_keepalive_expiry: float = 60.0
     
     # Graph Processing Configuration
     max_nodes_per_graph: int = 500
     max_api_calls_per_incident: int = 25
     max_transactions_per_node: int = 5
+    max_pages_per_node: int = 3  # Etherscan pages read while too few transactions clear the value filter
     processing_timeout_seconds: int = 30
     max_depth: int = 8
+    max_concurrent_jobs: int = 5
+    progress_update_interval_seconds: float = 0.25  # Min gap between progress writes
     
     # Cache Configuration
     cache_ttl_seconds: int = 600  # 10 minutes
+    cache_max_entries: int = 10000  # Etherscan responses kept before LRU eviction
+    redis_url: Optional[str] = None  # Shared Etherscan cache across workers when set
+    health_cache_ttl_seconds: float = 10.0  # Reuse of a healthy /health result
     
     # Minimum values for transaction filtering
     min_transaction_value_eth: float = 0.05
@@ -59,41 +74,54 @@ class Settings(BaseSettings):
     # Node.js Service Integration
     node_service_url: Optional[str] = "http://localhost:3000"
     allowed_origins: list[str] = ["http://localhost:3000", "http://127.0.0.1:3000"]
+    trusted_hosts: list[str] = []  # Empty disables Host header filtering
     
     # Logging Configuration
     log_level: str = "INFO"
     log_format: str = "json"
+    log_skip_paths: list[str] = ["/", "/health", "/stats", "/docs", "/redoc", "/openapi.json"]
     
     class Config:
         """Pydantic configuration."""
         env_file = ".env"
         case_sensitive = False
         
-    def get_database_config(self) -> dict:
-        """Get database connection configuration."""
+    @cached_property
+    def database_config(self) -> dict:
+        """Database connection configuration, built once; treat as read-only."""
         return {
             "dsn": self.database_url,
             "min_size": self.database_pool_min_size,
             "max_size": self.database_pool_max_size,
-            "command_timeout": self.database_timeout
+            "command_timeout": self.database_timeout,
+            "statement_cache_size": self.database_statement_cache_size,
+            "max_inactive_connection_lifetime": self.database_max_inactive_connection_lifetime
         }
     
-    def get_etherscan_config(self) -> dict:
-        """Get Etherscan API configuration."""
+    @cached_property
+    def etherscan_config(self) -> dict:
+        """Etherscan API configuration, built once; treat as read-only."""
         return {
             "api_key": self.etherscan_api_key,
             "base_url": self.etherscan_base_url,
             "timeout": self.etherscan_timeout,
             "retry_attempts": self.etherscan_retry_attempts,
-            "retry_delay": self.etherscan_retry_delay
+            "retry_delay": self.etherscan_retry_delay,
+            "requests_per_second": self.etherscan_requests_per_second,
+            "http2": self.etherscan_http2,
+            "max_connections": self.etherscan_max_connections,
+            "max_keepalive_connections": self.etherscan_max_keepalive_connections,
+            "keepalive_expiry": self.etherscan_keepalive_expiry
         }
     
-    def get_processing_limits(self) -> dict:
-        """Get processing constraint configuration.""" 
+    @cached_property
+    def processing_limits(self) -> dict:
+        """Processing constraint configuration, built once; treat as read-only."""
         return {
             "max_nodes": self.max_nodes_per_graph,
             "max_api_calls": self.max_api_calls_per_incident,
             "max_transactions_per_node": self.max_transactions_per_node,
+            "max_pages_per_node": self.max_pages_per_node,
             "timeout_seconds": self.processing_timeout_seconds,
             "max_depth": self.max_depth
         }
@@ -1,14 +1,94 @@
 """Database connection and utilities for the Graph Mapping Service."""
 
 import asyncpg
+import orjson
 import structlog
-from typing import Optional, Dict, Any, List
+from typing import Optional, Dict, Any, List, Tuple
 from contextlib import asynccontextmanager
 
 from .config import settings
 
 logger = structlog.get_logger()
 
+# Rows per executemany call when bulk inserting graph data
+BULK_INSERT_CHUNK_SIZE = 500
+
+# Fixed statement text so the prepared plan is reused across status updates
+UPDATE_GRAPH_STATUS_SQL = """
+    UPDATE incident_graphs SET
+        status = $2,
+        progress_percentage = COALESCE($3, progress_percentage),
+        current_step = COALESCE($4, current_step),
+        error_message = COALESCE($5, error_message),
+        error_code = COALESCE($6, error_code),
+        partial_results = COALESCE($7, partial_results),
+        updated_at = CURRENT_TIMESTAMP
+    WHERE incident_id = $1
+"""
+
+UPDATE_GRAPH_RESULTS_SQL = """
+    UPDATE incident_graphs SET
+        status = 'completed',
+        progress_percentage = 100,
+        total_nodes = $2,
+        total_edges = $3,
+        max_depth = $4,
+        total_value_traced = $5,
+        processing_time_seconds = $6,
+        api_calls_used = $7,
+        endpoint_summary = $8,
+        top_paths = $9,
+        updated_at = CURRENT_TIMESTAMP
+    WHERE incident_id = $1
+"""
+
+INSERT_GRAPH_NODE_SQL = """
+    INSERT INTO graph_nodes (
+        incident_id, address, entity_type, confidence_score, 
+        depth_from_hack, balance_eth, transaction_count,
+        first_seen, endpoint_type, termination_reason,
+        manual_exploration_ready, attributes
+    )
+    VALUES ($1, $2, $3, $4, $5, $6, $7, $8, $9, $10, $11, $12)
+    ON CONFLICT (incident_id, address) DO UPDATE SET
+        entity_type = EXCLUDED.entity_type,
+        confidence_score = EXCLUDED.confidence_score,
+        balance_eth = EXCLUDED.balance_eth,
+        transaction_count = EXCLUDED.transaction_count,
+        endpoint_type = EXCLUDED.endpoint_type,
+        termination_reason = EXCLUDED.termination_reason,
+        manual_exploration_ready = EXCLUDED.manual_exploration_ready,
+        attributes = EXCLUDED.attributes
+"""
+
+INSERT_GRAPH_EDGE_SQL = """
+    INSERT INTO graph_edges (
+        incident_id, from_address, to_address, transaction_hash,
+        value_eth, value_usd, priority_score, block_number,
+        timestamp, gas_used, gas_price, filter_reason, attributes
+    )
+    VALUES ($1, $2, $3, $4, $5, $6, $7, $8, $9, $10, $11, $12, $13)
+    ON CONFLICT (incident_id, from_address, to_address, transaction_hash) DO NOTHING
+"""
+
+
+def _encode_json(value: Any) -> str:
+    """Encode a value for a json/jsonb column; strings are assumed to be JSON already."""
+    if isinstance(value, str):
+        return value
+    return orjson.dumps(value).decode()
+
+
+async def _init_connection(conn: asyncpg.Connection) -> None:
+    """Register orjson codecs for JSON columns on each new pool connection."""
+    for type_name in ("json", "jsonb"):
+        await conn.set_type_codec(
+            type_name,
+            encoder=_encode_json,
+            decoder=orjson.loads,
+            schema="pg_catalog"
+        )
+
 
 class DatabaseManager:
     """Manages database connections and operations."""
@@ -19,8 +99,8 @@ class DatabaseManager:
     async def initialize(self):
         """Initialize database connection pool."""
         try:
-            config = settings.get_database_config()
-            self.pool = await asyncpg.create_pool(**config)
+            config = settings.database_config
+            self.pool = await asyncpg.create_pool(**config, init=_init_connection)
             logger.info("Database connection pool initialized", pool_size=config['max_size'])
         except Exception as e:
             logger.error("Failed to initialize database pool", error=str(e))
@@ -50,10 +130,12 @@ class DatabaseManager:
             async with self.get_connection() as conn:
                 await conn.fetchval("SELECT 1")
                 
+            size = self.pool.get_size()
+            idle = self.pool.get_idle_size()
             pool_stats = {
-                "active": len(self.pool._holders) - len(self.pool._queue._queue),
-                "idle": len(self.pool._queue._queue), 
-                "max": self.pool._maxsize
+                "active": size - idle,
+                "idle": idle,
+                "max": self.pool.get_max_size()
             }
             
             return {
@@ -71,23 +153,29 @@ class IncidentRepository:
     def __init__(self, db_manager: DatabaseManager):
         self.db = db_manager
     
-    async def get_incident_by_id(self, incident_id: str) -> Optional[Dict[str, Any]]:
+    async def get_incident_by_id(self, incident_id: str) -> Optional[asyncpg.Record]:
         """Get incident details by ID."""
         async with self.db.get_connection() as conn:
-            row = await conn.fetchrow(
-                "SELECT * FROM incidents WHERE id = $1",
+            return await conn.fetchrow(
+                """
+                SELECT id, wallet_address, transaction_hash, created_at
+                FROM incidents WHERE id = $1
+                """,
                 incident_id
             )
-            return dict(row) if row else None
     
-    async def get_incident_transaction_details(self, incident_id: str) -> List[Dict[str, Any]]:
-        """Get transaction details for an incident."""
+    async def get_incident_transaction_details(self, incident_id: str) -> List[asyncpg.Record]:
+        """Get transaction details for an incident, without the raw API payload."""
         async with self.db.get_connection() as conn:
-            rows = await conn.fetch(
-                "SELECT * FROM transaction_details WHERE incident_id = $1",
+            return await conn.fetch(
+                """
+                SELECT id, incident_id, block_number, timestamp_unix, from_address,
+                       to_address, value, gas, gas_used, gas_price, is_error
+                FROM transaction_details WHERE incident_id = $1
+                ORDER BY id
+                """,
                 incident_id
             )
-            return [dict(row) for row in rows]
 
 
 class GraphRepository:
@@ -96,20 +184,39 @@ class GraphRepository:
     def __init__(self, db_manager: DatabaseManager):
         self.db = db_manager
     
-    async def create_incident_graph(self, incident_id: str) -> None:
-        """Create initial incident graph record."""
+    async def create_incident_graph(self, incident_id: str) -> asyncpg.Record:
+        """
+        Create or reset the incident graph record in a single round trip.
+        
+        The record is only (re)set to pending when the incident exists and no
+        processing is already pending or running for it.
+        
+        Returns:
+            Record with incident_exists and created columns
+        """
         async with self.db.get_connection() as conn:
-            await conn.execute(
+            # The guard is evaluated against the locked row, so of two concurrent
+            # claims only the first resets it
+            return await conn.fetchrow(
                 """
-                INSERT INTO incident_graphs (incident_id, status)
-                VALUES ($1, 'pending')
-                ON CONFLICT (incident_id) DO UPDATE SET
-                    status = 'pending',
-                    progress_percentage = 0,
-                    current_step = NULL,
-                    error_message = NULL,
-                    error_code = NULL,
-                    updated_at = CURRENT_TIMESTAMP
+                WITH inc AS (
+                    SELECT id FROM incidents WHERE id = $1
+                ), upsert AS (
+                    INSERT INTO incident_graphs (incident_id, status)
+                    SELECT id, 'pending' FROM inc
+                    ON CONFLICT (incident_id) DO UPDATE SET
+                        status = 'pending',
+                        progress_percentage = 0,
+                        current_step = NULL,
+                        error_message = NULL,
+                        error_code = NULL,
+                        updated_at = CURRENT_TIMESTAMP
+                    WHERE incident_graphs.status NOT IN ('pending', 'running')
+                    RETURNING incident_id
+                )
+                SELECT
+                    EXISTS (SELECT 1 FROM inc) AS incident_exists,
+                    EXISTS (SELECT 1 FROM upsert) AS created
                 """,
                 incident_id
             )
@@ -124,83 +231,28 @@ class GraphRepository:
         error_code: Optional[str] = None,
         partial_results: Optional[Dict[str, Any]] = None
     ) -> None:
-        """Update incident graph processing status."""
-        async with self.db.get_connection() as conn:
-            query_parts = ["UPDATE incident_graphs SET status = $2, updated_at = CURRENT_TIMESTAMP"]
-            params = [incident_id, status]
-            param_count = 2
-            
-            if progress is not None:
-                param_count += 1
-                query_parts.append(f"progress_percentage = ${param_count}")
-                params.append(progress)
-            
-            if current_step is not None:
-                param_count += 1
-                query_parts.append(f"current_step = ${param_count}")
-                params.append(current_step)
-                
-            if error_message is not None:
-                param_count += 1
-                query_parts.append(f"error_message = ${param_count}")
-                params.append(error_message)
-                
-            if error_code is not None:
-                param_count += 1
-                query_parts.append(f"error_code = ${param_count}")
-                params.append(error_code)
-                
-            if partial_results is not None:
-                param_count += 1
-                query_parts.append(f"partial_results = ${param_count}")
-                params.append(partial_results)
-            
-            query = " , ".join(query_parts) + " WHERE incident_id = $1"
-            await conn.execute(query, *params)
-    
-    async def update_graph_results(
-        self,
-        incident_id: str,
-        total_nodes: int,
-        total_edges: int,
-        max_depth: int,
-        total_value_traced: str,
-        processing_time: int,
-        api_calls_used: int,
-        endpoint_summary: Dict[str, int],
-        top_paths: List[Dict[str, Any]]
-    ) -> None:
-        """Update incident graph with final results."""
+        """Update incident graph processing status; None leaves a column unchanged."""
         async with self.db.get_connection() as conn:
             await conn.execute(
-                """
-                UPDATE incident_graphs SET
-                    status = 'completed',
-                    progress_percentage = 100,
-                    total_nodes = $2,
-                    total_edges = $3,
-                    max_depth = $4,
-                    total_value_traced = $5,
-                    processing_time_seconds = $6,
-                    api_calls_used = $7,
-                    endpoint_summary = $8,
-                    top_paths = $9,
-                    updated_at = CURRENT_TIMESTAMP
-                WHERE incident_id = $1
-                """,
-                incident_id, total_nodes, total_edges, max_depth, 
-                total_value_traced, processing_time, api_calls_used,
-                endpoint_summary, top_paths
+                UPDATE_GRAPH_STATUS_SQL,
+                incident_id, status, progress, current_step,
+                error_message, error_code, partial_results
             )
     
-    async def get_graph_status(self, incident_id: str) -> Optional[Dict[str, Any]]:
+    async def get_graph_status(self, incident_id: str) -> Optional[asyncpg.Record]:
         """Get current graph processing status."""
         async with self.db.get_connection() as conn:
-            row = await conn.fetchrow(
-                "SELECT * FROM incident_graphs WHERE incident_id = $1",
+            return await conn.fetchrow(
+                """
+                SELECT incident_id, status, progress_percentage, current_step,
+                       error_message, error_code, partial_results,
+                       total_nodes, total_edges, max_depth, total_value_traced,
+                       processing_time_seconds, api_calls_used,
+                       endpoint_summary, top_paths, created_at, updated_at
+                FROM incident_graphs WHERE incident_id = $1
+                """,
                 incident_id
             )
-            return dict(row) if row else None
     
     async def insert_graph_node(
         self,
@@ -212,32 +264,15 @@ class GraphRepository:
         **kwargs
     ) -> None:
         """Insert a new graph node."""
+        record = self._graph_node_record(incident_id, {
+            "address": address,
+            "entity_type": entity_type,
+            "confidence_score": confidence_score,
+            "depth_from_hack": depth_from_hack,
+            **kwargs
+        })
         async with self.db.get_connection() as conn:
-            await conn.execute(
-                """
-                INSERT INTO graph_nodes (
-                    incident_id, address, entity_type, confidence_score, 
-                    depth_from_hack, balance_eth, transaction_count,
-                    first_seen, endpoint_type, termination_reason,
-                    manual_exploration_ready, attributes
-                )
-                VALUES ($1, $2, $3, $4, $5, $6, $7, $8, $9, $10, $11, $12)
-                ON CONFLICT (incident_id, address) DO UPDATE SET
-                    entity_type = EXCLUDED.entity_type,
-                    confidence_score = EXCLUDED.confidence_score,
-                    balance_eth = EXCLUDED.balance_eth,
-                    transaction_count = EXCLUDED.transaction_count,
-                    endpoint_type = EXCLUDED.endpoint_type,
-                    termination_reason = EXCLUDED.termination_reason,
-                    manual_exploration_ready = EXCLUDED.manual_exploration_ready,
-                    attributes = EXCLUDED.attributes
-                """,
-                incident_id, address, entity_type, confidence_score, depth_from_hack,
-                kwargs.get('balance_eth', 0), kwargs.get('transaction_count', 0),
-                kwargs.get('first_seen'), kwargs.get('endpoint_type', 'Unknown'),
-                kwargs.get('termination_reason'), kwargs.get('manual_exploration_ready', False),
-                kwargs.get('attributes', {})
-            )
+            await conn.execute(INSERT_GRAPH_NODE_SQL, *record)
     
     async def insert_graph_edge(
         self,
@@ -249,23 +284,83 @@ class GraphRepository:
         **kwargs
     ) -> None:
         """Insert a new graph edge."""
+        record = self._graph_edge_record(incident_id, {
+            "from_address": from_address,
+            "to_address": to_address,
+            "transaction_hash": transaction_hash,
+            "value_eth": value_eth,
+            **kwargs
+        })
         async with self.db.get_connection() as conn:
-            await conn.execute(
-                """
-                INSERT INTO graph_edges (
-                    incident_id, from_address, to_address, transaction_hash,
-                    value_eth, value_usd, priority_score, block_number,
-                    timestamp, gas_used, gas_price, filter_reason, attributes
+            await conn.execute(INSERT_GRAPH_EDGE_SQL, *record)
+    
+    async def finalize_graph(
+        self,
+        incident_id: str,
+        nodes: List[Dict[str, Any]],
+        edges: List[Dict[str, Any]],
+        total_nodes: int,
+        total_edges: int,
+        max_depth: int,
+        total_value_traced: str,
+        processing_time: int,
+        api_calls_used: int,
+        endpoint_summary: Dict[str, int],
+        top_paths: List[Dict[str, Any]]
+    ) -> None:
+        """
+        Persist the final graph and mark it completed in a single transaction.
+        
+        Nodes and edges are written in bulk before the completed status, so
+        readers never see a completed graph without its data.
+        """
+        node_records = [self._graph_node_record(incident_id, node) for node in nodes]
+        edge_records = [self._graph_edge_record(incident_id, edge) for edge in edges]
+        
+        async with self.db.get_connection() as conn:
+            async with conn.transaction():
+                await self._executemany_chunked(conn, INSERT_GRAPH_NODE_SQL, node_records)
+                await self._executemany_chunked(conn, INSERT_GRAPH_EDGE_SQL, edge_records)
+                await conn.execute(
+                    UPDATE_GRAPH_RESULTS_SQL,
+                    incident_id, total_nodes, total_edges, max_depth,
+                    total_value_traced, processing_time, api_calls_used,
+                    endpoint_summary, top_paths
                 )
-                VALUES ($1, $2, $3, $4, $5, $6, $7, $8, $9, $10, $11, $12, $13)
-                ON CONFLICT (incident_id, from_address, to_address, transaction_hash) DO NOTHING
-                """,
-                incident_id, from_address, to_address, transaction_hash, value_eth,
-                kwargs.get('value_usd'), kwargs.get('priority_score', 0), 
-                kwargs.get('block_number'), kwargs.get('timestamp'),
-                kwargs.get('gas_used'), kwargs.get('gas_price'),
-                kwargs.get('filter_reason'), kwargs.get('attributes', {})
-            )
+    
+    @staticmethod
+    async def _executemany_chunked(
+        conn: asyncpg.Connection,
+        query: str,
+        records: List[Tuple[Any, ...]]
+    ) -> None:
+        """Run executemany over records in fixed-size chunks on one connection."""
+        for start in range(0, len(records), BULK_INSERT_CHUNK_SIZE):
+            await conn.executemany(query, records[start:start + BULK_INSERT_CHUNK_SIZE])
+    
+    @staticmethod
+    def _graph_node_record(incident_id: str, node: Dict[str, Any]) -> Tuple[Any, ...]:
+        """Build the positional parameters for INSERT_GRAPH_NODE_SQL."""
+        return (
+            incident_id, node["address"], node.get("entity_type", "Unknown"),
+            node.get("confidence_score", 0.0), node.get("depth_from_hack", 0),
+            node.get("balance_eth", 0), node.get("transaction_count", 0),
+            node.get("first_seen"), node.get("endpoint_type", "Unknown"),
+            node.get("termination_reason"), node.get("manual_exploration_ready", False),
+            node.get("attributes", {})
+        )
+    
+    @staticmethod
+    def _graph_edge_record(incident_id: str, edge: Dict[str, Any]) -> Tuple[Any, ...]:
+        """Build the positional parameters for INSERT_GRAPH_EDGE_SQL."""
+        return (
+            incident_id, edge["from_address"], edge["to_address"],
+            edge["transaction_hash"], edge["value_eth"],
+            edge.get("value_usd"), edge.get("priority_score", 0),
+            edge.get("block_number"), edge.get("timestamp"),
+            edge.get("gas_used"), edge.get("gas_price"),
+            edge.get("filter_reason"), edge.get("attributes", {})
+        )
 
 
 # Global database manager instance
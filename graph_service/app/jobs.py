@@ -3,7 +3,8 @@
 import asyncio
 import time
 import structlog
-from typing import Dict, Optional, Any
+from dataclasses import dataclass, field
+from typing import Dict, Optional, Any, Mapping
 from datetime import datetime, timedelta
 from uuid import uuid4
 
@@ -16,12 +17,25 @@ from .services.classification import AddressClassifier
 logger = structlog.get_logger()
 
 
+@dataclass(slots=True)
+class JobRecord:
+    """In-memory record of a graph processing job."""
+    job_id: str
+    incident_id: str
+    created_at: datetime
+    status: str = "pending"
+    created_monotonic: Optional[float] = None
+    estimated_completion: Optional[datetime] = None
+    options: Dict[str, Any] = field(default_factory=dict)
+    graph_service: Optional[GraphMappingService] = None
+
+
 class JobManager:
     """Manages async job processing for graph mapping."""
     
     def __init__(self):
         # In-memory job tracking (would use Redis/queue in production)
-        self.active_jobs: Dict[str, Dict[str, Any]] = {}
+        self.active_jobs: Dict[str, JobRecord] = {}
         self.job_tasks: Dict[str, asyncio.Task] = {}
         
         # Service instances
@@ -30,9 +44,15 @@ class JobManager:
         self.etherscan_service = EtherscanService()
         self.classifier = AddressClassifier()
         
-        # Rate limiting
+        # Concurrency limiting - jobs queue for a slot instead of delaying callers
         self.last_job_start: Optional[float] = None
-        self.min_job_interval = 1.0  # Minimum seconds between jobs
+        self.max_concurrent_jobs = settings.max_concurrent_jobs
+        self.job_slots = asyncio.Semaphore(self.max_concurrent_jobs)
+        
+        # Limits read on every status poll, cached to skip settings lookups
+        self.max_api_calls = settings.max_api_calls_per_incident
+        self.processing_timeout = settings.processing_timeout_seconds
+        self.processing_limits = settings.processing_limits
     
     async def initialize(self):
         """Initialize services."""
@@ -43,17 +63,16 @@ class JobManager:
         """Clean shutdown - cancel running jobs."""
         logger.info("Shutting down job manager")
         
-        # Cancel all running tasks
-        for job_id, task in self.job_tasks.items():
+        # Cancel all running tasks, then wait for them together
+        tasks = list(self.job_tasks.items())
+        for job_id, task in tasks:
             if not task.done():
                 logger.info("Cancelling job", job_id=job_id)
                 task.cancel()
-                try:
-                    await task
-                except asyncio.CancelledError:
-                    pass
+        await asyncio.gather(*(task for _, task in tasks), return_exceptions=True)
         
-        await self.etherscan_service.close()
+        # Shield so a cancelled shutdown still closes HTTP connections
+        await asyncio.shield(self.etherscan_service.close())
         logger.info("Job manager shutdown complete")
     
     async def start_job(self, incident_id: str, options: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
@@ -67,9 +86,9 @@ class JobManager:
         Returns:
             Job creation response
         """
-        # Check if job already exists for this incident
-        existing_status = await self.graph_repo.get_graph_status(incident_id)
-        if existing_status and existing_status["status"] in ["pending", "running"]:
+        # Verify the incident exists and claim its graph record in one round trip
+        claim = await self.graph_repo.create_incident_graph(incident_id)
+        if claim["incident_exists"] and not claim["created"]:
             return {
                 "status": "conflict",
                 "error_code": "ALREADY_PROCESSING",
@@ -77,15 +96,7 @@ class JobManager:
                 "existing_job_id": incident_id  # Using incident_id as job_id for simplicity
             }
         
-        # Rate limiting check
-        if self.last_job_start:
-            time_since_last = time.time() - self.last_job_start
-            if time_since_last < self.min_job_interval:
-                await asyncio.sleep(self.min_job_interval - time_since_last)
-        
-        # Verify incident exists
-        incident = await self.incident_repo.get_incident_by_id(incident_id)
-        if not incident:
+        if not claim["incident_exists"]:
             return {
                 "status": "error",
                 "error_code": "INCIDENT_NOT_FOUND",
@@ -95,26 +106,25 @@ class JobManager:
         # Create job record
         job_id = incident_id  # Using incident_id as job_id for simplicity
         created_at = datetime.now()
-        estimated_completion = created_at + timedelta(seconds=30)
+        estimated_completion = created_at + timedelta(seconds=self.processing_timeout)
         
-        self.active_jobs[job_id] = {
-            "job_id": job_id,
-            "incident_id": incident_id,
-            "status": "pending",
-            "created_at": created_at,
-            "estimated_completion": estimated_completion,
-            "options": options or {}
-        }
-        
-        # Create incident graph record in database
-        await self.graph_repo.create_incident_graph(incident_id)
-        
-        # Start async processing task
+        # Start async processing task (one service per job, it holds traversal state)
         graph_service = GraphMappingService(
             self.incident_repo,
             self.graph_repo, 
             self.etherscan_service,
-            self.classifier
+            self.classifier,
+            limits=self.processing_limits
+        )
+        
+        self.active_jobs[job_id] = JobRecord(
+            job_id=job_id,
+            incident_id=incident_id,
+            created_at=created_at,
+            created_monotonic=time.monotonic(),
+            estimated_completion=estimated_completion,
+            options=options or {},
+            graph_service=graph_service
         )
         
         task = asyncio.create_task(self._process_job(job_id, graph_service))
@@ -145,35 +155,44 @@ class JobManager:
         Returns:
             Job status information or None if not found
         """
-        # Check in-memory first
+        # Jobs running in this process are served from their live state
         if job_id in self.active_jobs:
             job_info = self.active_jobs[job_id]
-            
-            # Get latest status from database
-            graph_status = await self.graph_repo.get_graph_status(job_id)
-            if graph_status:
-                return self._build_status_response(job_info, graph_status)
+            return self._build_status_response(job_info, self._live_status(job_info))
         
         # Check database for completed/failed jobs
         graph_status = await self.graph_repo.get_graph_status(job_id)
         if graph_status:
             # Create minimal job info for completed jobs
-            job_info = {
-                "job_id": job_id,
-                "incident_id": job_id,  # Same as job_id in our case
-                "created_at": graph_status["created_at"]
-            }
+            job_info = JobRecord(
+                job_id=job_id,
+                incident_id=job_id,  # Same as job_id in our case
+                created_at=graph_status["created_at"],
+                status=graph_status["status"]
+            )
             return self._build_status_response(job_info, graph_status)
         
         return None
     
-    def _build_status_response(self, job_info: Dict[str, Any], graph_status: Dict[str, Any]) -> Dict[str, Any]:
+    def _live_status(self, job_info: JobRecord) -> Dict[str, Any]:
+        """Build a graph status record from an in-process job's live state."""
+        graph_service = job_info.graph_service
+        return {
+            "status": job_info.status,
+            "progress_percentage": graph_service.progress,
+            "current_step": graph_service.current_step,
+            "api_calls_used": graph_service.api_calls_used,
+            "nodes_processed": graph_service.nodes_processed,
+            "edges_created": graph_service.edges_created
+        }
+    
+    def _build_status_response(self, job_info: JobRecord, graph_status: Mapping[str, Any]) -> Dict[str, Any]:
         """Build job status response from job info and graph status."""
         response = {
             "status": graph_status["status"],
-            "job_id": job_info["job_id"],
-            "incident_id": job_info["incident_id"],
-            "started_at": job_info["created_at"]
+            "job_id": job_info.job_id,
+            "incident_id": job_info.incident_id,
+            "started_at": job_info.created_at
         }
         
         # Add status-specific fields
@@ -181,24 +200,25 @@ class JobManager:
             if graph_status["progress_percentage"]:
                 # Calculate estimated remaining time
                 progress = graph_status["progress_percentage"]
-                if progress > 5:  # Avoid division by very small numbers
-                    elapsed = (datetime.now() - job_info["created_at"]).total_seconds()
-                    estimated_total = elapsed * 100 / progress
-                    remaining = max(0, estimated_total - elapsed)
-                    estimated_completion = datetime.now() + timedelta(seconds=remaining)
+                created_monotonic = job_info.created_monotonic
+                # Avoid division by very small numbers; only locally started jobs have a monotonic start
+                if progress > 5 and created_monotonic is not None:
+                    elapsed = time.monotonic() - created_monotonic
+                    remaining = max(0.0, elapsed * 100 / progress - elapsed)
+                    estimated_completion = datetime.fromtimestamp(time.time() + remaining)
                 else:
-                    estimated_completion = job_info.get("estimated_completion")
+                    estimated_completion = job_info.estimated_completion
                 
                 # Calculate API calls remaining
                 api_calls_used = graph_status.get("api_calls_used", 0)
-                api_calls_remaining = max(0, settings.max_api_calls_per_incident - api_calls_used)
+                api_calls_remaining = max(0, self.max_api_calls - api_calls_used)
                 
                 response.update({
                     "progress": {
                         "percentage": graph_status["progress_percentage"],
                         "current_step": graph_status.get("current_step", "initializing"),
-                        "nodes_processed": 0,  # Would need to track this
-                        "edges_created": 0,    # Would need to track this
+                        "nodes_processed": graph_status.get("nodes_processed", 0),
+                        "edges_created": graph_status.get("edges_created", 0),
                         "api_calls_used": api_calls_used,
                         "api_calls_remaining": api_calls_remaining
                     },
@@ -255,21 +275,20 @@ class JobManager:
             graph_service: Graph mapping service instance
         """
         try:
-            logger.info("Processing job started", job_id=job_id)
-            
-            # Update status to running
-            await self.graph_repo.update_graph_status(
-                job_id, "running", progress=5, current_step="initialization"
-            )
-            
-            # Process the incident
-            result = await graph_service.process_incident(job_id)
+            # Wait for a free processing slot; the job stays pending meanwhile
+            async with self.job_slots:
+                logger.info("Processing job started", job_id=job_id)
+                
+                # Mark running; the service persists its own progress from here
+                job_info = self.active_jobs.get(job_id)
+                if job_info is not None:
+                    job_info.status = "running"
+                
+                # Process the incident
+                result = await graph_service.process_incident(job_id)
             
             # Clean up completed job
-            if job_id in self.active_jobs:
-                del self.active_jobs[job_id]
-            if job_id in self.job_tasks:
-                del self.job_tasks[job_id]
+            self._cleanup(job_id)
             
             logger.info("Processing job completed", 
                        job_id=job_id,
@@ -288,19 +307,18 @@ class JobManager:
             )
             
             # Clean up
-            if job_id in self.active_jobs:
-                del self.active_jobs[job_id]
-            if job_id in self.job_tasks:
-                del self.job_tasks[job_id]
+            self._cleanup(job_id)
         
         except Exception as e:
             logger.error("Processing job failed", job_id=job_id, error=str(e))
             
             # Error should already be handled by graph_service, but ensure cleanup
-            if job_id in self.active_jobs:
-                del self.active_jobs[job_id]
-            if job_id in self.job_tasks:
-                del self.job_tasks[job_id]
+            self._cleanup(job_id)
+    
+    def _cleanup(self, job_id: str):
+        """Forget a finished job's in-memory record and task."""
+        self.active_jobs.pop(job_id, None)
+        self.job_tasks.pop(job_id, None)
     
     def get_job_stats(self) -> Dict[str, Any]:
         """Get statistics about job processing."""
@@ -310,7 +328,7 @@ class JobManager:
         # Count by status
         status_counts = {}
         for job in self.active_jobs.values():
-            status = job["status"]
+            status = job.status
             status_counts[status] = status_counts.get(status, 0) + 1
         
         return {
@@ -318,7 +336,7 @@ class JobManager:
             "active_tasks": task_count,
             "status_breakdown": status_counts,
             "last_job_start": self.last_job_start,
-            "rate_limit_interval": self.min_job_interval
+            "max_concurrent_jobs": self.max_concurrent_jobs
         }
 
 
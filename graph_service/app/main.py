@@ -1,17 +1,20 @@
 """Main FastAPI application for the Graph Mapping Service."""
 
+import asyncio
+import logging
+import re
 import structlog
 import time
 import json
+import orjson
 from contextlib import asynccontextmanager
-from typing import Dict, Any
+from typing import Dict, Any, Optional, Tuple
 from datetime import datetime
 
-from fastapi import FastAPI, HTTPException, Depends, status
+from fastapi import FastAPI, HTTPException, Depends, Response, status
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.middleware.trustedhost import TrustedHostMiddleware
-from fastapi.responses import JSONResponse
-from fastapi.encoders import jsonable_encoder
+from fastapi.responses import ORJSONResponse
 
 from .config import settings
 from .db import db_manager
@@ -25,34 +28,73 @@ from .schemas import (
     ConflictResponse
 )
 
-# Configure structured logging
-structlog.configure(
-    processors=[
-        structlog.stdlib.filter_by_level,
-        structlog.stdlib.add_logger_name,
-        structlog.stdlib.add_log_level,
-        structlog.stdlib.PositionalArgumentsFormatter(),
-        structlog.processors.TimeStamper(fmt="iso"),
-        structlog.processors.StackInfoRenderer(),
-        structlog.processors.format_exc_info,
-        structlog.processors.UnicodeDecoder(),
-        structlog.processors.JSONRenderer()
-    ],
-    context_class=dict,
-    logger_factory=structlog.stdlib.LoggerFactory(),
-    cache_logger_on_first_use=True,
+logger = structlog.get_logger()
+
+# Canonical 8-4-4-4-12 hex UUID form used for incident and job IDs
+_UUID_RE = re.compile(
+    r"\A[0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{12}\Z"
 )
 
-logger = structlog.get_logger()
+# Static response bodies, encoded once
+_ROOT_BYTES = orjson.dumps({
+    "service": settings.app_name,
+    "version": settings.app_version,
+    "status": "running",
+    "docs_url": "/docs",
+    "health_url": "/health"
+})
+_INTERNAL_ERROR_BYTES = orjson.dumps({
+    "status": "error",
+    "error_code": "INTERNAL_ERROR",
+    "message": "An internal error occurred"
+})
+_UNEXPECTED_RESPONSE_BYTES = orjson.dumps({
+    "status": "error",
+    "error_code": "UNEXPECTED_RESPONSE",
+    "message": "Unexpected response from job manager"
+})
+
+# Monitoring and docs paths that are not logged per request
+_LOG_SKIP_PATHS = frozenset(settings.log_skip_paths)
 
 # Track service uptime
 service_start_time = time.time()
 
+# Last healthy /health result and the monotonic time it was taken
+_health_cache: Optional[Tuple[float, HealthCheckResponse]] = None
+
+
+def _orjson_dumps(obj: Any, **kwargs: Any) -> str:
+    """JSON-encode a log event with orjson, as text for stdlib handlers."""
+    return orjson.dumps(obj, **kwargs).decode()
+
+
+def configure_logging():
+    """Configure structured logging; calls below the configured level are no-ops."""
+    level = getattr(logging, settings.log_level.upper(), logging.INFO)
+    # Print rendered events as-is unless the deployment already configured logging
+    logging.basicConfig(format="%(message)s", level=level)
+    structlog.configure(
+        processors=[
+            structlog.stdlib.add_logger_name,
+            structlog.processors.add_log_level,
+            structlog.processors.TimeStamper(fmt="iso", utc=True),
+            structlog.processors.format_exc_info,
+            structlog.processors.JSONRenderer(serializer=_orjson_dumps)
+        ],
+        wrapper_class=structlog.make_filtering_bound_logger(level),
+        context_class=dict,
+        # Emit through stdlib logging so uvicorn/stdlib handlers and routing apply
+        logger_factory=structlog.stdlib.LoggerFactory(),
+        cache_logger_on_first_use=True,
+    )
+
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Manage application lifespan - startup and shutdown."""
     # Startup
+    configure_logging()
     logger.info("Starting Graph Mapping Service", version=settings.app_version)
     
     try:
@@ -81,17 +123,59 @@ async def lifespan(app: FastAPI):
             logger.error("Error during shutdown", error=str(e))
 
 
+class RequestLoggingMiddleware:
+    """
+    Log HTTP requests, except high-frequency monitoring and docs paths.
+    
+    Plain ASGI middleware rather than @app.middleware("http"), which wraps every
+    request in an extra task and streaming response.
+    """
+    
+    def __init__(self, app):
+        self.app = app
+    
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] in _LOG_SKIP_PATHS:
+            await self.app(scope, receive, send)
+            return
+        
+        start_time = time.perf_counter()
+        status_code = 500
+        
+        async def send_with_status(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+        
+        # Process request
+        await self.app(scope, receive, send_with_status)
+        
+        # Log request details
+        process_time = time.perf_counter() - start_time
+        logger.info("HTTP request",
+                   method=scope["method"],
+                   path=scope["path"],
+                   query_params=scope["query_string"].decode("latin-1"),
+                   status_code=status_code,
+                   process_time=round(process_time, 3))
+
+
 # Create FastAPI app
 app = FastAPI(
     title="Graph Mapping Service",
     description="Transaction flow graph mapping service for cryptocurrency incident analysis",
     version=settings.app_version,
     lifespan=lifespan,
+    default_response_class=ORJSONResponse,
     docs_url="/docs",
     redoc_url="/redoc",
     openapi_url="/openapi.json"
 )
 
+# Add request logging middleware (innermost, so CORS preflights are not logged)
+app.add_middleware(RequestLoggingMiddleware)
+
 # Add CORS middleware
 app.add_middleware(
     CORSMiddleware,
@@ -101,11 +185,12 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Add trusted host middleware
-app.add_middleware(
-    TrustedHostMiddleware, 
-    allowed_hosts=["localhost", "127.0.0.1", "*"]
-)
+# Add trusted host middleware only when a real allowlist is configured
+if settings.trusted_hosts:
+    app.add_middleware(
+        TrustedHostMiddleware, 
+        allowed_hosts=settings.trusted_hosts
+    )
 
 
 @app.exception_handler(Exception)
@@ -117,27 +202,42 @@ async def global_exception_handler(request, exc):
                  error=str(exc),
                  error_type=type(exc).__name__)
     
-    return JSONResponse(
+    return Response(
+        content=_INTERNAL_ERROR_BYTES,
         status_code=500,
-        content={
-            "status": "error",
-            "error_code": "INTERNAL_ERROR",
-            "message": "An internal error occurred"
-        }
+        media_type="application/json"
     )
 
 
 # Health check endpoint
 @app.get("/health", response_model=HealthCheckResponse)
-async def health_check():
+async def health_check(response: Response):
     """Check service health status."""
-    uptime_seconds = int(time.time() - service_start_time)
+    global _health_cache
     
-    # Check database health
-    db_health = await db_manager.health_check()
+    # Serve a recent healthy result; degraded states are always re-checked
+    ttl = settings.health_cache_ttl_seconds
+    if _health_cache is not None and time.monotonic() - _health_cache[0] < ttl:
+        response.headers["Cache-Control"] = f"max-age={int(ttl)}"
+        response.headers["X-Cache"] = "HIT"
+        return _health_cache[1]
     
-    # Check external API health  
-    etherscan_health = await job_manager.etherscan_service.health_check()
+    uptime_seconds = int(time.time() - service_start_time)
+    
+    # Check database and external API health concurrently
+    db_health, etherscan_health = await asyncio.gather(
+        db_manager.health_check(),
+        job_manager.etherscan_service.health_check(),
+        return_exceptions=True
+    )
+    if isinstance(db_health, Exception):
+        db_health = {"status": "error", "error": str(db_health)}
+    if isinstance(etherscan_health, Exception):
+        etherscan_health = {
+            "status": "unavailable",
+            "last_check": datetime.now(),
+            "error": str(etherscan_health)
+        }
     
     # Determine overall status
     overall_status = "healthy"
@@ -146,13 +246,22 @@ async def health_check():
     elif etherscan_health["status"] != "available":
         overall_status = "degraded"
     
-    return HealthCheckResponse(
+    result = HealthCheckResponse(
         status=overall_status,
         timestamp=datetime.now(),
         uptime_seconds=uptime_seconds,
         database=db_health,
         external_apis={"etherscan": etherscan_health}
     )
+    
+    response.headers["X-Cache"] = "MISS"
+    if overall_status == "healthy":
+        _health_cache = (time.monotonic(), result)
+        response.headers["Cache-Control"] = f"max-age={int(ttl)}"
+    else:
+        _health_cache = None
+    
+    return result
 
 
 # Process incident endpoint
@@ -165,8 +274,8 @@ async def process_incident(
     logger.info("Processing incident request", incident_id=incident_id)
     
     try:
-        # Validate UUID format (basic check)
-        if len(incident_id) != 36 or incident_id.count('-') != 4:
+        # Validate UUID format
+        if not _UUID_RE.match(incident_id):
             raise HTTPException(
                 status_code=400,
                 detail={
@@ -176,43 +285,28 @@ async def process_incident(
                 }
             )
         
-        # Start job
+        # Start job; only options the caller actually set are carried along
         result = await job_manager.start_job(
             incident_id,
-            options=request.options.model_dump() if request.options else None
+            options=request.options.model_dump(exclude_unset=True) if request.options else None
         )
         
-        # Handle different response types - use jsonable_encoder for proper serialization
+        # Handle different response types; orjson serializes datetimes natively
         if result["status"] == "accepted":
-            return JSONResponse(
-                status_code=202,
-                content=jsonable_encoder(result)
-            )
+            return ORJSONResponse(status_code=202, content=result)
         elif result["status"] == "conflict":
-            return JSONResponse(
-                status_code=409,
-                content=jsonable_encoder(result)
-            )
+            return ORJSONResponse(status_code=409, content=result)
         elif result["status"] == "error":
             if result["error_code"] == "INCIDENT_NOT_FOUND":
-                return JSONResponse(
-                    status_code=404,
-                    content=jsonable_encoder(result)
-                )
+                return ORJSONResponse(status_code=404, content=result)
             else:
-                return JSONResponse(
-                    status_code=400,
-                    content=jsonable_encoder(result)
-                )
+                return ORJSONResponse(status_code=400, content=result)
         else:
             # Unexpected status
-            return JSONResponse(
+            return Response(
+                content=_UNEXPECTED_RESPONSE_BYTES,
                 status_code=500,
-                content={
-                    "status": "error",
-                    "error_code": "UNEXPECTED_RESPONSE",
-                    "message": "Unexpected response from job manager"
-                }
+                media_type="application/json"
             )
     
     except HTTPException:
@@ -238,8 +332,8 @@ async def get_job_status(job_id: str):
     logger.debug("Getting job status", job_id=job_id)
     
     try:
-        # Validate UUID format (basic check)
-        if len(job_id) != 36 or job_id.count('-') != 4:
+        # Validate UUID format
+        if not _UUID_RE.match(job_id):
             raise HTTPException(
                 status_code=400,
                 detail={
@@ -262,10 +356,7 @@ async def get_job_status(job_id: str):
                 }
             )
         
-        return JSONResponse(
-            status_code=200,
-            content=jsonable_encoder(result)
-        )
+        return ORJSONResponse(status_code=200, content=result)
     
     except HTTPException:
         raise
@@ -308,7 +399,7 @@ async def get_service_stats():
         "jobs": job_stats,
         "etherscan_cache": etherscan_stats,
         "classifier": classifier_stats,
-        "limits": settings.get_processing_limits()
+        "limits": settings.processing_limits
     }
 
 
@@ -316,34 +407,7 @@ async def get_service_stats():
 @app.get("/")
 async def root():
     """Service information."""
-    return {
-        "service": settings.app_name,
-        "version": settings.app_version,
-        "status": "running",
-        "docs_url": "/docs",
-        "health_url": "/health"
-    }
-
-
-# Add request logging middleware
-@app.middleware("http")
-async def log_requests(request, call_next):
-    """Log all HTTP requests."""
-    start_time = time.time()
-    
-    # Process request
-    response = await call_next(request)
-    
-    # Log request details
-    process_time = time.time() - start_time
-    logger.info("HTTP request",
-               method=request.method,
-               path=str(request.url.path),
-               query_params=str(request.query_params),
-               status_code=response.status_code,
-               process_time=round(process_time, 3))
-    
-    return response
+    return Response(content=_ROOT_BYTES, media_type="application/json")
 
 
 if __name__ == "__main__":
@@ -2,7 +2,7 @@
 
 from datetime import datetime
 from typing import Optional, Dict, Any, List
-from pydantic import BaseModel, Field, ConfigDict
+from pydantic import BaseModel, Field
 from enum import Enum
 
 
@@ -108,8 +108,6 @@ class JobStatusResponse(BaseModel):
     # Partial results (for timeout/error cases)
     partial_results: Optional[PartialResults] = None
 
-    model_config = ConfigDict(use_enum_values=True)
-
 
 class ErrorResponse(BaseModel):
     """Standard error response."""
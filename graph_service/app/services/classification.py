@@ -1,6 +1,7 @@
 """Address classification service for endpoint detection."""
 
 import structlog
+from collections import Counter
 from typing import Dict, Tuple, Optional
 from datetime import datetime, timedelta
 
@@ -45,13 +46,18 @@ class AddressClassifier:
             "0xa0b86a33e6c68c93d8b48fc5b41bc1ee0ba9f41d": ("Bridge", 80, "Polygon Bridge"),
         }
         
+        # Entity counts kept in step with known_addresses for the stats endpoint
+        self._entity_counts = Counter(
+            entity_type for entity_type, _, _ in self.known_addresses.values()
+        )
+        
         # Patterns for address classification
         self.address_patterns = {
             "high_frequency": 100,  # transactions per day threshold
             "consolidation": 3      # times seen in graph threshold
         }
     
-    async def classify_address(
+    def classify_address(
         self, 
         address: str,
         transaction_count: int = 0,
@@ -61,6 +67,9 @@ class AddressClassifier:
         """
         Classify an address and return (entity_type, confidence_score, details).
         
+        Pure in-memory lookup and heuristics, so it is a plain function rather
+        than a coroutine.
+        
         Args:
             address: Ethereum address to classify
             transaction_count: Total transaction count for the address
@@ -209,18 +218,19 @@ class AddressClassifier:
         name: str
     ):
         """Add a new known address to the classification database."""
-        self.known_addresses[address.lower()] = (entity_type, confidence, name)
+        address_lower = address.lower()
+        previous = self.known_addresses.get(address_lower)
+        if previous is not None:
+            self._entity_counts[previous[0]] -= 1
+        self.known_addresses[address_lower] = (entity_type, confidence, name)
+        self._entity_counts[entity_type] += 1
         logger.info("Added known address", 
                    address=address, entity_type=entity_type, name=name)
     
     def get_classification_stats(self) -> Dict[str, any]:
         """Get statistics about the classification system."""
-        entity_counts = {}
-        for entity_type, _, _ in self.known_addresses.values():
-            entity_counts[entity_type] = entity_counts.get(entity_type, 0) + 1
-        
         return {
             "total_known_addresses": len(self.known_addresses),
-            "entity_type_counts": entity_counts,
+            "entity_type_counts": {k: v for k, v in self._entity_counts.items() if v},
             "classification_patterns": self.address_patterns
         }
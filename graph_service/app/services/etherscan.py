@@ -1,10 +1,16 @@
 """Etherscan API client service."""
 
 import asyncio
+import time
+import urllib.request
 import httpx
+import orjson
+import redis.asyncio as aioredis
 import structlog
-from datetime import datetime, timedelta
-from typing import Dict, List, Optional, Any
+from aiolimiter import AsyncLimiter
+from cachetools import TTLCache
+from datetime import datetime
+from typing import Any, AsyncIterator, Dict, Iterable, List, Optional, Tuple
 from tenacity import (
     retry, 
     stop_after_attempt, 
@@ -28,64 +34,157 @@ class EtherscanRateLimitError(EtherscanError):
     pass
 
 
+# Seconds a health probe result is reused, so frequent probes don't spend API quota
+HEALTH_CHECK_TTL_SECONDS = 5.0
+
+# Sentinel for cache lookups, since a cached result may itself be None
+_CACHE_MISS = object()
+
+# Values Etherscan uses for an empty or zero hex quantity
+_HEX_ZERO = frozenset(("0x", "0x0"))
+
+
+def _environment_proxy(url: str) -> Optional[httpx.Proxy]:
+    """Proxy for url from HTTP(S)_PROXY / NO_PROXY; httpx skips them for a custom transport."""
+    target = httpx.URL(url)
+    if urllib.request.proxy_bypass(target.host):
+        return None
+    proxy_url = urllib.request.getproxies().get(target.scheme)
+    return httpx.Proxy(proxy_url) if proxy_url else None
+
+
+def _hex_to_int(hex_str: Optional[str]) -> int:
+    """Convert hex string to integer."""
+    if not hex_str or hex_str in _HEX_ZERO:
+        return 0
+    return int(hex_str, 16)
+
+
+def _hex_to_decimal_string(hex_str: Optional[str]) -> str:
+    """Convert hex to decimal string for large numbers."""
+    if not hex_str or hex_str in _HEX_ZERO:
+        return "0"
+    return str(int(hex_str, 16))
+
+
 class EtherscanService:
     """Async Etherscan API client with caching and rate limiting."""
     
     def __init__(self):
-        self.config = settings.get_etherscan_config()
+        self.config = settings.etherscan_config
         self.client: Optional[httpx.AsyncClient] = None
-        self.cache: Dict[str, Dict[str, Any]] = {}
+        self.redis: Optional[aioredis.Redis] = None  # Optional L2 cache behind self.cache
         self.cache_ttl = settings.cache_ttl_seconds
+        # Bounded LRU with per-entry expiry; expired entries are purged on write
+        self.cache: TTLCache = TTLCache(
+            maxsize=settings.cache_max_entries,
+            ttl=self.cache_ttl,
+            timer=time.monotonic
+        )
+        # Token bucket shared by every job, so bursts are paced instead of hitting 429s
+        self.limiter = AsyncLimiter(self.config["requests_per_second"], 1)
+        # Requests in flight by cache key, so concurrent misses share one call
+        self._inflight: Dict[str, asyncio.Task] = {}
+        # Last health probe result with its monotonic timestamp
+        self._last_health: Optional[Tuple[float, Dict[str, Any]]] = None
+        self._health_refresh: Optional[asyncio.Task] = None
         
     async def initialize(self):
-        """Initialize HTTP client."""
+        """Initialize the shared HTTP client."""
+        # One long-lived pool; retries are left to tenacity in _make_request
+        transport = httpx.AsyncHTTPTransport(
+            http2=self.config["http2"],
+            limits=httpx.Limits(
+                max_connections=self.config["max_connections"],
+                max_keepalive_connections=self.config["max_keepalive_connections"],
+                keepalive_expiry=self.config["keepalive_expiry"]
+            ),
+            retries=0,
+            proxy=_environment_proxy(self.config["base_url"])
+        )
         self.client = httpx.AsyncClient(
             base_url=self.config["base_url"],
             timeout=self.config["timeout"],
-            headers={"User-Agent": "GraphMappingService/1.0"}
+            headers={"User-Agent": "GraphMappingService/1.0"},
+            params={"apikey": self.config["api_key"]},  # Merged into every request
+            transport=transport
         )
-        logger.info("Etherscan service initialized")
+        if settings.redis_url:
+            self.redis = aioredis.from_url(settings.redis_url)
+        logger.info("Etherscan service initialized", shared_cache=self.redis is not None)
     
     async def close(self):
         """Close HTTP client."""
+        if self._health_refresh is not None and not self._health_refresh.done():
+            self._health_refresh.cancel()
         if self.client:
             await self.client.aclose()
             logger.info("Etherscan service closed")
+        if self.redis:
+            await self.redis.aclose()
     
-    def _get_cache_key(self, endpoint: str, params: Dict[str, Any]) -> str:
-        """Generate cache key for request."""
-        param_str = "&".join(f"{k}={v}" for k, v in sorted(params.items()) if k != "apikey")
-        return f"{endpoint}:{param_str}"
+    def _cache_response(self, cache_key: str, result: Any):
+        """Cache the result payload of an API response."""
+        self.cache[cache_key] = result
     
-    def _is_cache_valid(self, cache_entry: Dict[str, Any]) -> bool:
-        """Check if cache entry is still valid."""
-        if "timestamp" not in cache_entry:
-            return False
-        cache_time = cache_entry["timestamp"]
-        return datetime.now() - cache_time < timedelta(seconds=self.cache_ttl)
+    def _get_cached_response(self, cache_key: str) -> Any:
+        """Get cached result if still valid, else _CACHE_MISS."""
+        result = self.cache.get(cache_key, _CACHE_MISS)
+        if result is not _CACHE_MISS:
+            logger.debug("Cache hit", cache_key=cache_key)
+        return result
     
-    def _cache_response(self, cache_key: str, response: Dict[str, Any]):
-        """Cache API response."""
-        self.cache[cache_key] = {
-            "data": response,
-            "timestamp": datetime.now()
-        }
+    async def _fetch_once(self, cache_key: str, params: Dict[str, Any]) -> Any:
+        """
+        Fetch and cache a response's result, sharing one request among concurrent callers.
+        
+        The request runs as its own task and callers await it through a shield,
+        so a cancelled caller does not abort the fetch for the others.
+        """
+        task = self._inflight.get(cache_key)
+        if task is None:
+            task = asyncio.create_task(self._fetch_result(cache_key, params))
+            self._inflight[cache_key] = task
+            task.add_done_callback(lambda done: self._finish_fetch(cache_key, done))
+        return await asyncio.shield(task)
     
-    def _get_cached_response(self, cache_key: str) -> Optional[Dict[str, Any]]:
-        """Get cached response if valid."""
-        if cache_key in self.cache:
-            entry = self.cache[cache_key]
-            if self._is_cache_valid(entry):
-                logger.debug("Cache hit", cache_key=cache_key)
-                return entry["data"]
-            else:
-                # Remove expired entry
-                del self.cache[cache_key]
-        return None
+    async def _fetch_result(self, cache_key: str, params: Dict[str, Any]) -> Any:
+        """
+        Get a result from the shared cache, or request it and keep only its payload.
+        
+        Shared cache errors are logged and fall through to the API.
+        """
+        redis_key = f"etherscan:{cache_key}"
+        if self.redis is not None:
+            try:
+                payload = await self.redis.get(redis_key)
+                if payload is not None:
+                    return orjson.loads(payload)
+            except aioredis.RedisError as e:
+                logger.warning("Shared cache read failed", error=str(e))
+        
+        response = await self._make_request(params)
+        result = response.get("result")
+        
+        if self.redis is not None:
+            try:
+                await self.redis.set(redis_key, orjson.dumps(result), ex=self.cache_ttl)
+            except aioredis.RedisError as e:
+                logger.warning("Shared cache write failed", error=str(e))
+        
+        return result
+    
+    def _finish_fetch(self, cache_key: str, task: asyncio.Task):
+        """Drop a finished request from the in-flight map and cache its result."""
+        self._inflight.pop(cache_key, None)
+        if not task.cancelled() and task.exception() is None:
+            self._cache_response(cache_key, task.result())
     
     @retry(
         stop=stop_after_attempt(3),
         wait=wait_exponential(multiplier=1, min=1, max=10),
+        # Includes rate limiting: the limiter is per process, and other workers
+        # sharing the API key can still exhaust its quota
         retry=retry_if_exception_type((httpx.RequestError, EtherscanError))
     )
     async def _make_request(self, params: Dict[str, Any]) -> Dict[str, Any]:
@@ -93,14 +192,12 @@ class EtherscanService:
         if not self.client:
             raise RuntimeError("Etherscan client not initialized")
         
-        # Add API key
-        params["apikey"] = self.config["api_key"]
-        
         try:
-            response = await self.client.get("", params=params)
+            async with self.limiter:
+                response = await self.client.get("", params=params)
             response.raise_for_status()
             
-            data = response.json()
+            data = orjson.loads(response.content)
             
             # Check for API-level errors
             if isinstance(data, dict):
@@ -151,19 +248,40 @@ class EtherscanService:
             "sort": sort
         }
         
-        cache_key = self._get_cache_key("account_txlist", params)
+        cache_key = f"account_txlist:{address}:{start_block}:{end_block}:{page}:{offset}:{sort}"
         
         # Check cache first
-        cached_response = self._get_cached_response(cache_key)
-        if cached_response:
-            return cached_response.get("result", [])
-        
-        logger.debug("Fetching account transactions", address=address, start_block=start_block)
+        cached_result = self._get_cached_response(cache_key)
+        if cached_result is _CACHE_MISS:
+            logger.debug("Fetching account transactions", address=address, start_block=start_block)
+            cached_result = await self._fetch_once(cache_key, params)
         
-        response = await self._make_request(params)
-        self._cache_response(cache_key, response)
+        return cached_result if cached_result is not None else []
+    
+    async def iter_account_transactions(
+        self,
+        address: str,
+        start_block: int = 0,
+        end_block: int = 99999999,
+        offset: int = 50,
+        sort: str = "asc"
+    ) -> AsyncIterator[List[TransactionData]]:
+        """
+        Yield an address's normalized transactions one page at a time.
         
-        return response.get("result", [])
+        Each page is requested only when the caller asks for it, so callers stop
+        paging by stopping iteration. Iteration ends after a short page, once
+        the history is exhausted. Malformed entries are skipped.
+        """
+        page = 1
+        while True:
+            raw_txs = await self.get_account_transactions(
+                address, start_block, end_block, page, offset, sort
+            )
+            yield self.normalize_transactions(raw_txs)
+            if len(raw_txs) < offset:
+                return
+            page += 1
     
     async def get_transaction_by_hash(self, tx_hash: str) -> Optional[Dict[str, Any]]:
         """Get transaction details by hash."""
@@ -173,19 +291,16 @@ class EtherscanService:
             "txhash": tx_hash
         }
         
-        cache_key = self._get_cache_key("tx_by_hash", params)
+        cache_key = f"tx_by_hash:{tx_hash}"
         
         # Check cache first
-        cached_response = self._get_cached_response(cache_key)
-        if cached_response:
-            return cached_response.get("result")
+        cached_result = self._get_cached_response(cache_key)
+        if cached_result is not _CACHE_MISS:
+            return cached_result
         
         logger.debug("Fetching transaction by hash", tx_hash=tx_hash)
         
-        response = await self._make_request(params)
-        self._cache_response(cache_key, response)
-        
-        return response.get("result")
+        return await self._fetch_once(cache_key, params)
     
     async def get_transaction_receipt(self, tx_hash: str) -> Optional[Dict[str, Any]]:
         """Get transaction receipt by hash."""
@@ -195,85 +310,107 @@ class EtherscanService:
             "txhash": tx_hash
         }
         
-        cache_key = self._get_cache_key("tx_receipt", params)
+        cache_key = f"tx_receipt:{tx_hash}"
         
         # Check cache first
-        cached_response = self._get_cached_response(cache_key)
-        if cached_response:
-            return cached_response.get("result")
+        cached_result = self._get_cached_response(cache_key)
+        if cached_result is not _CACHE_MISS:
+            return cached_result
         
         logger.debug("Fetching transaction receipt", tx_hash=tx_hash)
         
-        response = await self._make_request(params)
-        self._cache_response(cache_key, response)
-        
-        return response.get("result")
+        return await self._fetch_once(cache_key, params)
     
     def normalize_transaction(self, raw_tx: Dict[str, Any]) -> TransactionData:
         """Normalize raw Etherscan transaction data."""
-        def hex_to_int(hex_str: str) -> int:
-            """Convert hex string to integer."""
-            if not hex_str or hex_str in ("0x", "0x0"):
-                return 0
-            return int(hex_str, 16)
-        
-        def hex_to_decimal_string(hex_str: str) -> str:
-            """Convert hex to decimal string for large numbers."""
-            if not hex_str or hex_str in ("0x", "0x0"):
-                return "0"
-            return str(int(hex_str, 16))
+        get = raw_tx.get
         
         # Handle timestamp conversion
         timestamp = None
-        if "timeStamp" in raw_tx:
+        raw_timestamp = get("timeStamp")
+        if raw_timestamp is not None:
             try:
-                timestamp = datetime.fromtimestamp(int(raw_tx["timeStamp"]))
+                timestamp = datetime.fromtimestamp(int(raw_timestamp))
             except (ValueError, TypeError):
                 pass
         
+        to_address = get("to") or ""
+        
         return TransactionData(
-            block_number=hex_to_int(raw_tx.get("blockNumber", "0x0")),
+            block_number=_hex_to_int(get("blockNumber", "0x0")),
             timestamp=timestamp,
-            from_address=raw_tx.get("from", "").lower(),
-            to_address=raw_tx.get("to", "").lower() if raw_tx.get("to") else "",
-            value=hex_to_decimal_string(raw_tx.get("value", "0x0")),
-            gas=hex_to_int(raw_tx.get("gas", "0x0")),
-            gas_used=hex_to_int(raw_tx.get("gasUsed", "0x0")),
-            gas_price=hex_to_int(raw_tx.get("gasPrice", "0x0")),
-            transaction_hash=raw_tx.get("hash", "")
+            from_address=get("from", "").lower(),
+            to_address=to_address.lower(),
+            value=_hex_to_decimal_string(get("value", "0x0")),
+            gas=_hex_to_int(get("gas", "0x0")),
+            gas_used=_hex_to_int(get("gasUsed", "0x0")),
+            gas_price=_hex_to_int(get("gasPrice", "0x0")),
+            transaction_hash=get("hash", "")
         )
     
+    def normalize_transactions(self, raw_txs: Iterable[Dict[str, Any]]) -> List[TransactionData]:
+        """Normalize a page of raw transactions in one pass, skipping malformed entries."""
+        normalized = []
+        append = normalized.append
+        normalize = self.normalize_transaction
+        for raw_tx in raw_txs:
+            try:
+                append(normalize(raw_tx))
+            except Exception as e:
+                logger.warning("Failed to normalize transaction", error=str(e))
+        return normalized
+    
     async def health_check(self) -> Dict[str, Any]:
-        """Check if Etherscan API is accessible."""
+        """
+        Check if Etherscan API is accessible, reusing a result for a few seconds.
+        
+        Once a result goes stale it is still returned immediately while a single
+        background probe refreshes it, so health checks never queue behind
+        traversal traffic on the shared rate limiter. Only the first check waits.
+        """
+        last = self._last_health
+        if last is not None and time.monotonic() - last[0] < HEALTH_CHECK_TTL_SECONDS:
+            return last[1]
+        
+        if self._health_refresh is None or self._health_refresh.done():
+            self._health_refresh = asyncio.create_task(self._probe_health())
+        if last is not None:
+            return last[1]
+        return await asyncio.shield(self._health_refresh)
+    
+    async def _probe_health(self) -> Dict[str, Any]:
+        """Probe the API once and record the result for health_check."""
         try:
-            # Simple test call to get latest block
+            # Simple test call to get latest block; a single attempt, so a
+            # failing API does not tie up limiter slots with retries
             params = {
                 "module": "proxy", 
                 "action": "eth_blockNumber"
             }
             
-            response = await self._make_request(params)
+            await self._make_request.retry_with(stop=stop_after_attempt(1))(self, params)
             
-            return {
+            health = {
                 "status": "available",
                 "last_check": datetime.now()
             }
         except Exception as e:
             logger.error("Etherscan health check failed", error=str(e))
-            return {
+            health = {
                 "status": "unavailable",
                 "last_check": datetime.now(),
                 "error": str(e)
             }
+        
+        self._last_health = (time.monotonic(), health)
+        return health
     
     def get_cache_stats(self) -> Dict[str, Any]:
         """Get cache statistics."""
-        valid_entries = sum(1 for entry in self.cache.values() if self._is_cache_valid(entry))
-        
+        # TTLCache excludes expired entries from its length
         return {
             "total_entries": len(self.cache),
-            "valid_entries": valid_entries,
-            "expired_entries": len(self.cache) - valid_entries,
+            "max_entries": self.cache.maxsize,
             "ttl_seconds": self.cache_ttl
         }
     
@@ -3,13 +3,16 @@ Core Graph Mapping Service implementing the algorithm from docs/graph_mapping_sp
 """
 
 import asyncio
+import heapq
 import time
 import networkx as nx
+import numpy as np
 import structlog
 from datetime import datetime, timedelta
 from decimal import Decimal
 from typing import Dict, List, Tuple, Optional, Set, Any
-from collections import defaultdict
+from collections import Counter, defaultdict, deque
+from operator import itemgetter
 
 from ..config import settings
 from ..db import IncidentRepository, GraphRepository
@@ -19,6 +22,14 @@ from .classification import AddressClassifier
 
 logger = structlog.get_logger()
 
+WEI_PER_ETH = 10 ** 18
+TRANSACTIONS_PAGE_SIZE = 50  # Etherscan rows per page, enough to apply filters effectively
+
+
+def _wei_to_eth(value_wei: int) -> str:
+    """Format a wei amount as an exact ETH decimal string."""
+    return f"{Decimal(value_wei) / WEI_PER_ETH:f}"
+
 
 class GraphProcessingError(Exception):
     """Custom exception for graph processing errors."""
@@ -41,7 +52,8 @@ class GraphMappingService:
         incident_repo: IncidentRepository,
         graph_repo: GraphRepository,
         etherscan_service: EtherscanService,
-        classifier: AddressClassifier
+        classifier: AddressClassifier,
+        limits: Optional[Dict[str, Any]] = None
     ):
         self.incident_repo = incident_repo
         self.graph_repo = graph_repo
@@ -51,18 +63,28 @@ class GraphMappingService:
         # Processing state
         self.graph: Optional[nx.DiGraph] = None
         self.incident_id: Optional[str] = None
-        self.processing_start_time: Optional[float] = None
+        self.processing_start_time: Optional[float] = None  # time.monotonic() at run start
         self.api_calls_used = 0
         self.nodes_processed = 0
         self.edges_created = 0
+        self.progress = 0
+        self.current_step = "pending"
+        self.last_progress_write: Optional[float] = None
+        self.progress_write_interval = settings.progress_update_interval_seconds
         
-        # Processing limits from config
-        self.limits = settings.get_processing_limits()
+        # Processing limits, shared by the caller or read from config
+        self.limits = limits if limits is not None else settings.processing_limits
+        # Nodes fetched from Etherscan at once; the service's limiter paces the calls
+        self.node_concurrency = settings.etherscan_concurrency
         
         # Address tracking
-        self.address_visit_count: Dict[str, int] = defaultdict(int)
+        self.address_visit_count: Counter[str] = Counter()
         self.processed_nodes: Set[str] = set()
-        self.pending_nodes: List[Tuple[str, int]] = []  # (address, depth)
+        # Heap of (-priority_score, depth, address): highest-priority, shallowest first
+        self.pending_nodes: List[Tuple[int, int, str]] = []
+        
+        # Incident-wide values, resolved on first use
+        self._total_stolen: Optional[float] = None
         
     async def process_incident(self, incident_id: str) -> Dict[str, Any]:
         """
@@ -75,11 +97,13 @@ class GraphMappingService:
             Dictionary with processing results and statistics
         """
         self.incident_id = incident_id
-        self.processing_start_time = time.time()
+        self.processing_start_time = time.monotonic()
         
         logger.info("Starting graph processing", incident_id=incident_id)
         
         try:
+            await self.update_progress(5, "initialization")
+            
             # Step 1: Initialize graph from incident data
             await self._initialize_graph()
             
@@ -92,7 +116,7 @@ class GraphMappingService:
             # Step 4: Calculate final statistics and save results
             results = await self._finalize_results()
             
-            processing_time = time.time() - self.processing_start_time
+            processing_time = time.monotonic() - self.processing_start_time
             logger.info("Graph processing completed", 
                        incident_id=incident_id,
                        processing_time=processing_time,
@@ -122,6 +146,32 @@ class GraphMappingService:
                         error_type=type(e).__name__)
             return await self._handle_general_error(e)
     
+    async def update_progress(self, progress: int, current_step: str):
+        """
+        Record running progress locally and persist it to the database.
+        
+        Writes are coalesced: the database is only updated when the step
+        changes or the write interval has passed. Terminal states are written
+        separately by the finalize and error handlers, so skipped ticks are
+        never lost.
+        """
+        step_changed = current_step != self.current_step
+        self.progress = progress
+        self.current_step = current_step
+        
+        now = time.monotonic()
+        if (not step_changed and self.last_progress_write is not None and
+                now - self.last_progress_write < self.progress_write_interval):
+            return
+        
+        self.last_progress_write = now
+        await self.graph_repo.update_graph_status(
+            self.incident_id,
+            "running",
+            progress=progress,
+            current_step=current_step
+        )
+    
     async def _initialize_graph(self):
         """Step 1: Initialize NetworkX graph from incident data."""
         logger.debug("Initializing graph", incident_id=self.incident_id)
@@ -150,7 +200,7 @@ class GraphMappingService:
                     hack_tx_hash=hack_tx.get("transaction_hash", "unknown"))
         
         # Create Node 0: victim wallet address (depth 0)
-        await self._add_graph_node(
+        self._add_graph_node(
             victim_address, 
             depth=0,
             entity_type="victim_wallet",
@@ -158,7 +208,7 @@ class GraphMappingService:
         )
         
         # Create Node 1: hacker wallet address (depth 1) 
-        await self._add_graph_node(
+        self._add_graph_node(
             hacker_address,
             depth=1, 
             entity_type="hacker_wallet",
@@ -166,18 +216,19 @@ class GraphMappingService:
         )
         
         # Add edge: victim → hacker (labeled with hack transaction hash)
-        hack_value = hack_tx.get("value", "0")
-        await self._add_graph_edge(
+        # Stored as a wei string; the Node ingest writes 1e21 and above in exponent form
+        hack_value_wei = int(Decimal(hack_tx.get("value") or 0))
+        self._add_graph_edge(
             victim_address,
             hacker_address, 
             hack_tx.get("transaction_hash", ""),
-            hack_value,
+            hack_value_wei,
             priority_score=100,
             filter_reason="initial_hack_transaction"
         )
         
         # Add hacker address to pending processing queue
-        self.pending_nodes.append((hacker_address, 1))
+        heapq.heappush(self.pending_nodes, (-100, 1, hacker_address))
         
         logger.debug("Graph initialized successfully", 
                     nodes=self.graph.number_of_nodes(),
@@ -188,81 +239,181 @@ class GraphMappingService:
         logger.debug("Starting recursive traversal", 
                     pending_nodes=len(self.pending_nodes))
         
-        while (self.pending_nodes and 
-               self.api_calls_used < self.limits["max_api_calls"] and
-               self.graph.number_of_nodes() < self.limits["max_nodes"]):
+        # Limits are fixed for the run, read them once
+        max_api_calls = self.limits["max_api_calls"]
+        max_nodes = self.limits["max_nodes"]
+        max_depth = self.limits["max_depth"]
+        max_pages_per_node = self.limits["max_pages_per_node"]
+        max_new_nodes_per_node = self.limits["max_transactions_per_node"]
+        deadline = self.processing_start_time + self.limits["timeout_seconds"]
+        graph = self.graph
+        pending_nodes = self.pending_nodes
+        processed_nodes = self.processed_nodes
+        
+        while (pending_nodes and 
+               self.api_calls_used < max_api_calls and
+               graph.number_of_nodes() < max_nodes):
             
             # Check timeout
-            if time.time() - self.processing_start_time > self.limits["timeout_seconds"]:
+            if time.monotonic() > deadline:
                 raise asyncio.TimeoutError("Processing timeout reached")
             
-            # Process next node
-            current_address, current_depth = self.pending_nodes.pop(0)
+            # Take the next batch of nodes that fits the remaining API budget at
+            # full page cost and the remaining node capacity (always at least one)
+            batch_size = max(1, min(
+                self.node_concurrency,
+                (max_api_calls - self.api_calls_used) // max(1, max_pages_per_node),
+                (max_nodes - graph.number_of_nodes()) // max(1, max_new_nodes_per_node)
+            ))
+            batch = []
+            while pending_nodes and len(batch) < batch_size:
+                _, current_depth, current_address = heapq.heappop(pending_nodes)
+                
+                # Skip if already processed or depth limit reached
+                if (current_address in processed_nodes or 
+                    current_depth >= max_depth):
+                    continue
+                
+                processed_nodes.add(current_address)
+                batch.append((current_address, current_depth))
             
-            # Skip if already processed or depth limit reached
-            if (current_address in self.processed_nodes or 
-                current_depth >= self.limits["max_depth"]):
+            if not batch:
                 continue
-                
-            await self._process_node(current_address, current_depth)
-            self.processed_nodes.add(current_address)
-            self.nodes_processed += 1
+            
+            # Track address visits
+            self.address_visit_count.update(address for address, _ in batch)
+            
+            # Fetch the batch concurrently, then expand the graph one node at a time;
+            # if one fetch fails unexpectedly, its siblings are cancelled, not left running
+            fetches = [
+                asyncio.create_task(self._fetch_node_transactions(address, depth))
+                for address, depth in batch
+            ]
+            try:
+                fetched = await asyncio.gather(*fetches)
+            except BaseException:
+                for fetch in fetches:
+                    fetch.cancel()
+                await asyncio.gather(*fetches, return_exceptions=True)
+                raise
+            for (address, depth), node_transactions in zip(batch, fetched):
+                if node_transactions is not None:
+                    await self._process_node(address, depth, *node_transactions)
+                self.nodes_processed += 1
             
             # Update progress
             progress = min(95, (self.nodes_processed / 20) * 100)  # Approximate progress
-            await self.graph_repo.update_graph_status(
-                self.incident_id, 
-                "running",
-                progress=int(progress),
-                current_step="recursive_traversal"
-            )
+            await self.update_progress(int(progress), "recursive_traversal")
         
         logger.debug("Recursive traversal completed",
                     nodes_processed=self.nodes_processed,
                     api_calls_used=self.api_calls_used,
                     final_nodes=self.graph.number_of_nodes())
     
-    async def _process_node(self, address: str, depth: int):
-        """Process a single node - fetch transactions and apply filtering."""
+    def _reserve_api_call(self) -> bool:
+        """Claim one call from the incident's API budget; False once it is spent."""
+        if self.api_calls_used >= self.limits["max_api_calls"]:
+            return False
+        self.api_calls_used += 1
+        return True
+    
+    async def _fetch_node_transactions(
+        self, address: str, depth: int
+    ) -> Optional[Tuple[List[TransactionData], int]]:
+        """
+        Fetch a node's normalized transactions from Etherscan.
+        
+        Pages through the address history until enough outgoing transactions
+        pass the primary value filters, the history runs out, or the page or API
+        budget is spent. Each page's call is reserved from the budget before it
+        is made, so concurrently fetched nodes cannot overrun it.
+        
+        Returns:
+            (transactions, first page size), or None if the first page could not be fetched
+        """
         logger.debug("Processing node", address=address, depth=depth)
         
-        # Track address visits
-        self.address_visit_count[address] += 1
+        # Outgoing transactions at or above this value pass the primary filters
+        hack_value = await self._get_total_stolen_amount()
+        floor_eth = settings.min_transaction_value_eth
+        if hack_value > 0:
+            floor_eth = max(floor_eth, hack_value * self._get_min_percentage_threshold(hack_value) / 100)
+        floor_wei = int(floor_eth * WEI_PER_ETH)
         
+        # Query Etherscan for transactions from this address
+        start_block = 0
+        if address in self.graph.nodes:
+            start_block = self.graph.nodes[address].get("first_seen", 0)
+        
+        wanted = self.limits["max_transactions_per_node"]
+        transactions: List[TransactionData] = []
+        first_page_count = 0
+        candidates = 0
+        pages_read = 0
+        pages = self.etherscan.iter_account_transactions(
+            address=address,
+            start_block=start_block,
+            offset=TRANSACTIONS_PAGE_SIZE,
+            sort="asc"
+        )
         try:
-            # Query Etherscan for transactions from this address
-            start_block = 0
-            if address in self.graph.nodes:
-                start_block = self.graph.nodes[address].get("first_seen", 0)
-            
-            transactions = await self.etherscan.get_account_transactions(
-                address=address,
-                start_block=start_block,
-                offset=50,  # Get more to apply filters effectively
-                sort="asc"
-            )
-            self.api_calls_used += 1
-            
-            # Apply transaction filtering pipeline
-            filtered_transactions = await self._apply_filtering_pipeline(
-                transactions, address, depth
-            )
-            
-            # Process top priority transactions (max 5)
-            for tx_data in filtered_transactions[:self.limits["max_transactions_per_node"]]:
-                await self._process_transaction(tx_data, address, depth)
-            
-            # Check termination conditions for this node
-            await self._check_termination_conditions(address, len(transactions), len(filtered_transactions))
-            
-        except (EtherscanError, EtherscanRateLimitError) as e:
-            logger.warning("Failed to process node due to API error",
-                          address=address, error=str(e))
-            # Continue processing other nodes
+            while pages_read < self.limits["max_pages_per_node"] and self._reserve_api_call():
+                try:
+                    page_transactions = await anext(pages, None)
+                except (EtherscanError, EtherscanRateLimitError) as e:
+                    logger.warning("Failed to process node due to API error",
+                                  address=address, page=pages_read + 1, error=str(e))
+                    # Keep the pages already read; continue processing other nodes
+                    break
+                if page_transactions is None:
+                    self.api_calls_used -= 1  # History exhausted, no request was made
+                    break
+                
+                pages_read += 1
+                if pages_read == 1:
+                    first_page_count = len(page_transactions)
+                transactions.extend(page_transactions)
+                candidates += sum(
+                    1 for tx in page_transactions
+                    if tx.from_address == address and int(tx.value) >= floor_wei
+                )
+                if candidates >= wanted:
+                    break
+        finally:
+            await pages.aclose()
+        
+        if not pages_read:
+            logger.debug("No page of node history fetched", address=address)
+            return None
+        if candidates < wanted:
+            logger.debug("Fewer candidate transactions than wanted",
+                        address=address, candidates=candidates, wanted=wanted)
+        return transactions, first_page_count
+    
+    async def _process_node(
+        self,
+        address: str,
+        depth: int,
+        transactions: List[TransactionData],
+        first_page_count: int
+    ):
+        """Process a single node - filter its transactions and expand the graph."""
+        # Apply transaction filtering pipeline
+        filtered_transactions = await self._apply_filtering_pipeline(
+            transactions, address, depth
+        )
+        
+        # Process top priority transactions (max 5)
+        for tx_data in filtered_transactions[:self.limits["max_transactions_per_node"]]:
+            await self._process_transaction(tx_data, address, depth)
+        
+        # Check termination conditions for this node; classification sees one
+        # page of history, as before paging, so its count thresholds keep their meaning
+        await self._check_termination_conditions(address, first_page_count, len(filtered_transactions))
     
     async def _apply_filtering_pipeline(
         self, 
-        transactions: List[Dict[str, Any]], 
+        transactions: List[TransactionData], 
         current_address: str,
         depth: int
     ) -> List[TransactionData]:
@@ -273,62 +424,53 @@ class GraphMappingService:
         
         # Get hack transaction value for percentage calculations
         hack_value = await self._get_total_stolen_amount()
+        min_percentage = self._get_min_percentage_threshold(hack_value)
         
-        normalized_transactions = []
-        for tx in transactions:
-            try:
-                normalized = self.etherscan.normalize_transaction(tx)
-                normalized_transactions.append(normalized)
-            except Exception as e:
-                logger.warning("Failed to normalize transaction", error=str(e))
-                continue
+        count = len(transactions)
         
-        # PRIMARY FILTERS
-        primary_filtered = []
-        for tx in normalized_transactions:
-            # Only outgoing transactions
-            if tx.from_address.lower() != current_address.lower():
-                continue
-                
-            # Minimum value filter
-            value_eth = float(tx.value) / 1e18  # Convert wei to ETH
-            if value_eth < settings.min_transaction_value_eth:
-                continue
-                
-            # Percentage threshold (dynamic based on hack size)
-            if hack_value > 0:
-                percentage = (value_eth / hack_value) * 100
-                min_percentage = self._get_min_percentage_threshold(hack_value)
-                if percentage < min_percentage:
-                    continue
-            
-            # Time-based priority (simplified - would need transaction timestamps)
-            # For now, prioritize recent transactions
-            
-            primary_filtered.append(tx)
+        # PRIMARY FILTERS (vectorized over the page)
+        values_eth = np.fromiter(
+            (float(tx.value) for tx in transactions), dtype=np.float64, count=count
+        ) / 1e18  # Convert wei to ETH
         
-        # SECONDARY FILTERS  
-        secondary_filtered = []
-        for tx in primary_filtered:
-            # Check if destination is high-frequency (would need additional API calls)
-            # For now, skip this check to stay within API limits
-            
-            # Round number priority - prioritize clean amounts
-            value_eth = float(tx.value) / 1e18
-            priority_score = self._calculate_priority_score(tx, value_eth)
-            
-            # Address reuse management
-            times_seen = self.address_visit_count.get(tx.to_address.lower(), 0)
-            if times_seen >= settings.reuse_threshold:
-                priority_score += 20  # Boost for consolidation points
-            
-            # Store priority score for sorting
-            tx.priority_score = priority_score
-            secondary_filtered.append(tx)
+        # Only outgoing transactions above the minimum value
+        # (addresses are lowercased at ingest, so they compare directly)
+        mask = np.fromiter(
+            (tx.from_address == current_address for tx in transactions), dtype=bool, count=count
+        )
+        mask &= values_eth >= settings.min_transaction_value_eth
+        
+        # Percentage threshold (dynamic based on hack size)
+        if hack_value > 0:
+            mask &= (values_eth / hack_value) * 100 >= min_percentage
+        
+        # Time-based priority (simplified - would need transaction timestamps)
+        primary_indices = np.flatnonzero(mask)
+        primary_filtered = [transactions[i] for i in primary_indices]
+        
+        # SECONDARY FILTERS
+        # Destination frequency checks would need additional API calls, skipped to stay within limits
+        gas_prices = np.fromiter(
+            (tx.gas_price or 0 for tx in primary_filtered), dtype=np.int64, count=len(primary_filtered)
+        )
+        priority_scores = self._calculate_priority_scores(values_eth[primary_indices], gas_prices)
+        
+        # Address reuse management - boost consolidation points
+        visits = self.address_visit_count
+        reuse_threshold = settings.reuse_threshold
+        reused = np.fromiter(
+            (visits[tx.to_address] >= reuse_threshold for tx in primary_filtered),
+            dtype=bool, count=len(primary_filtered)
+        )
+        priority_scores[reused] += 20
         
         # TERTIARY FILTERS (fine-tuning)
-        # Sort by priority score
-        secondary_filtered.sort(key=lambda t: getattr(t, 'priority_score', 0), reverse=True)
+        # Sort by priority score, keeping page order among equal scores
+        secondary_filtered = []
+        for i in np.argsort(-priority_scores, kind="stable"):
+            tx = primary_filtered[i]
+            tx.priority_score = int(priority_scores[i])
+            secondary_filtered.append(tx)
         
         logger.debug("Filtering pipeline results",
                     address=current_address,
@@ -347,53 +489,42 @@ class GraphMappingService:
         else:
             return settings.min_percentage_small_hack
     
-    def _calculate_priority_score(self, tx: TransactionData, value_eth: float) -> int:
-        """Calculate priority score for transaction selection."""
-        score = 0
-        
+    def _calculate_priority_scores(self, values_eth: np.ndarray, gas_prices: np.ndarray) -> np.ndarray:
+        """Calculate priority scores for transaction selection, one per transaction."""
         # Value-based scoring
-        if value_eth > 10:
-            score += 50
-        elif value_eth > 1:
-            score += 30
-        elif value_eth > 0.1:
-            score += 20
-        else:
-            score += 10
+        scores = np.select(
+            [values_eth > 10, values_eth > 1, values_eth > 0.1],
+            [50, 30, 20],
+            default=10
+        ).astype(np.int64)
         
         # Round number bonus (fewer than 3 decimal places)
-        if value_eth == int(value_eth) or (value_eth * 1000) == int(value_eth * 1000):
-            score += 10
+        milli_eth = values_eth * 1000
+        scores[(values_eth == np.trunc(values_eth)) | (milli_eth == np.trunc(milli_eth))] += 10
         
         # Gas price priority (above average indicates urgency)
-        if tx.gas_price and tx.gas_price > 20000000000:  # > 20 gwei
-            score += 15
+        scores[gas_prices > 20000000000] += 15  # > 20 gwei
         
-        return min(score, 100)
+        return np.minimum(scores, 100)
     
     async def _process_transaction(self, tx: TransactionData, from_address: str, depth: int):
         """Process a single filtered transaction."""
-        to_address = tx.to_address.lower()
-        
-        # Skip if destination already exists with sufficient data
-        if to_address in self.graph.nodes and self.graph.nodes[to_address].get("processed", False):
-            return
+        to_address = tx.to_address
         
         # Create destination node if it doesn't exist
         if to_address not in self.graph.nodes:
-            await self._add_graph_node(to_address, depth=depth + 1)
+            self._add_graph_node(to_address, depth=depth + 1)
             
             # Add to pending processing if not too deep
             if depth + 1 < self.limits["max_depth"]:
-                self.pending_nodes.append((to_address, depth + 1))
+                heapq.heappush(self.pending_nodes, (-tx.priority_score, depth + 1, to_address))
         
         # Add edge for this transaction
-        value_eth = str(float(tx.value) / 1e18)
-        await self._add_graph_edge(
+        self._add_graph_edge(
             from_address,
             to_address,
             tx.transaction_hash,
-            value_eth,
+            int(tx.value),
             priority_score=getattr(tx, 'priority_score', 0),
             block_number=tx.block_number,
             timestamp=tx.timestamp,
@@ -413,7 +544,7 @@ class GraphMappingService:
         """Check if exploration should terminate at this address."""
         
         # Classify the address
-        entity_type, confidence, details = await self.classifier.classify_address(
+        entity_type, confidence, details = self.classifier.classify_address(
             address,
             transaction_count=total_tx_count,
             times_seen_in_graph=self.address_visit_count[address]
@@ -447,8 +578,7 @@ class GraphMappingService:
                     "manual_exploration_ready": confidence < 80
                 })
             
-            # Remove from pending if still there
-            self.pending_nodes = [(addr, d) for addr, d in self.pending_nodes if addr != address]
+            # Queued entries for this address are skipped on dequeue, it is already processed
     
     async def _optimize_graph(self):
         """Step 3: Graph optimization and post-processing."""
@@ -460,31 +590,34 @@ class GraphMappingService:
         # Entity consolidation
         await self._consolidate_entities()
         
-        # Flow analysis
-        await self._analyze_flows()
-        
         logger.debug("Graph optimization completed",
                     final_nodes=self.graph.number_of_nodes(),
                     final_edges=self.graph.number_of_edges())
     
     async def _remove_dead_ends(self):
-        """Remove nodes with zero outgoing edges unless they're endpoints."""
-        nodes_to_remove = []
-        
-        for node in self.graph.nodes():
-            out_degree = self.graph.out_degree(node)
-            node_data = self.graph.nodes[node]
-            
-            # Keep nodes that are marked as endpoints or have termination reasons
-            if (out_degree == 0 and 
-                not node_data.get("termination_reason") and
-                node_data.get("entity_type") not in ["CEX", "DEX", "Mixer"]):
-                nodes_to_remove.append(node)
-        
-        for node in nodes_to_remove:
-            self.graph.remove_node(node)
-        
-        logger.debug("Removed dead ends", count=len(nodes_to_remove))
+        """Remove nodes with zero outgoing edges unless they're endpoints, cascading upstream."""
+        graph = self.graph
+        
+        def is_dead_end(node: str) -> bool:
+            node_data = graph.nodes[node]
+            # Keep the hack's victim and hacker, endpoints and nodes with termination reasons
+            return (node_data.get("depth_from_hack", 0) > 1 and
+                    not node_data.get("termination_reason") and
+                    node_data.get("entity_type") not in ("CEX", "DEX", "Mixer"))
+        
+        # Seed with current leaves; removing one may turn its predecessors into leaves
+        worklist = deque(node for node in graph.nodes() if graph.out_degree(node) == 0 and is_dead_end(node))
+        removed = 0
+        while worklist:
+            node = worklist.popleft()
+            predecessors = list(graph.predecessors(node))
+            graph.remove_node(node)
+            removed += 1
+            for pred in predecessors:
+                if graph.out_degree(pred) == 0 and is_dead_end(pred):
+                    worklist.append(pred)
+        
+        logger.debug("Removed dead ends", count=removed)
     
     async def _consolidate_entities(self):
         """Consolidate addresses belonging to the same entity."""
@@ -518,190 +651,177 @@ class GraphMappingService:
         
         # Merge edges and remove other nodes
         for addr in other_addresses:
-            # Redirect incoming edges to master
-            for pred in list(self.graph.predecessors(addr)):
-                if pred != master_address:  # Avoid self-loops
-                    edge_data = self.graph.edges[pred, addr]
-                    self.graph.add_edge(pred, master_address, **edge_data)
-            
-            # Redirect outgoing edges from master  
-            for succ in list(self.graph.successors(addr)):
-                if succ != master_address:  # Avoid self-loops
-                    edge_data = self.graph.edges[addr, succ]
-                    self.graph.add_edge(master_address, succ, **edge_data)
+            # Redirect incoming and outgoing edges to master, avoiding self-loops
+            redirected = [
+                (pred, master_address, edge_data)
+                for pred, _, edge_data in self.graph.in_edges(addr, data=True)
+                if pred != master_address
+            ]
+            redirected.extend(
+                (master_address, succ, edge_data)
+                for _, succ, edge_data in self.graph.out_edges(addr, data=True)
+                if succ != master_address
+            )
+            self.graph.add_edges_from(redirected)
             
             # Remove the consolidated node
             self.graph.remove_node(addr)
     
-    async def _analyze_flows(self):
-        """Analyze transaction flows and calculate percentages."""
+    async def _analyze_flows(self) -> Tuple[int, List[Dict[str, Any]]]:
+        """
+        Analyze transaction flows in a single pass over the edges.
+        
+        Sets each edge's flow percentage and importance, and collects the total
+        value traced (in wei) and the top transaction paths by value.
+        """
         total_stolen = await self._get_total_stolen_amount()
+        nodes = self.graph.nodes
+        total_value_wei = 0
+        paths = []
         
-        if total_stolen <= 0:
-            return
+        for from_addr, to_addr, edge_data in self.graph.edges(data=True):
+            value_wei = edge_data.get("value_wei", 0)
+            total_value_wei += value_wei
+            
+            # Calculate flow percentage and mark path importance
+            if total_stolen > 0:
+                flow_percentage = (value_wei / WEI_PER_ETH / total_stolen) * 100
+                edge_data["flow_percentage"] = flow_percentage
+                if flow_percentage > 10:
+                    edge_data["importance"] = "critical"
+                elif flow_percentage > 2:
+                    edge_data["importance"] = "significant"  
+                else:
+                    edge_data["importance"] = "minor"
+            
+            # Simple top paths: high-value direct paths only
+            if value_wei > WEI_PER_ETH // 10:  # Only significant values (> 0.1 ETH)
+                to_data = nodes[to_addr]
+                path = {
+                    "path_id": len(paths) + 1,
+                    "value_eth": _wei_to_eth(value_wei),
+                    "value_percentage": edge_data.get("flow_percentage", 0),
+                    "hop_count": 1,  # Direct path
+                    "final_endpoint_type": to_data.get("entity_type", "Unknown"),
+                    "final_endpoint_confidence": to_data.get("confidence_score", 0)
+                }
+                paths.append((value_wei, path))
         
-        # Calculate flow percentages for each path
-        for edge in self.graph.edges(data=True):
-            from_addr, to_addr, edge_data = edge
-            value_eth = float(edge_data.get("value_eth", 0))
-            flow_percentage = (value_eth / total_stolen) * 100
-            edge_data["flow_percentage"] = flow_percentage
-            
-            # Mark path importance
-            if flow_percentage > 10:
-                edge_data["importance"] = "critical"
-            elif flow_percentage > 2:
-                edge_data["importance"] = "significant"  
-            else:
-                edge_data["importance"] = "minor"
+        # Keep the top 10 by value without sorting every candidate
+        top_paths = heapq.nlargest(10, paths, key=itemgetter(0))
+        return total_value_wei, [path for _, path in top_paths]
     
     async def _finalize_results(self) -> Dict[str, Any]:
         """Calculate final statistics and save results."""
-        processing_time = int(time.time() - self.processing_start_time)
+        processing_time = int(time.monotonic() - self.processing_start_time)
         
         # Calculate statistics
         total_nodes = self.graph.number_of_nodes()
         total_edges = self.graph.number_of_edges()
-        max_depth = max([self.graph.nodes[n].get("depth_from_hack", 0) for n in self.graph.nodes()], default=0)
         
-        # Calculate total value traced
-        total_value = sum([
-            float(edge_data.get("value_eth", 0))
-            for _, _, edge_data in self.graph.edges(data=True)
-        ])
-        
-        # Endpoint summary
+        # Max depth and endpoint summary in one pass over the nodes
+        max_depth = 0
         endpoint_summary = defaultdict(int)
-        for node in self.graph.nodes():
-            entity_type = self.graph.nodes[node].get("entity_type", "Unknown")
-            endpoint_summary[entity_type] += 1
-        
-        # Generate top paths
-        top_paths = await self._generate_top_paths()
-        
-        # Save results to database
-        await self.graph_repo.update_graph_results(
+        for _, node_data in self.graph.nodes(data=True):
+            max_depth = max(max_depth, node_data.get("depth_from_hack", 0))
+            endpoint_summary[node_data.get("entity_type", "Unknown")] += 1
+        
+        # Flow analysis, total value traced and top paths in one pass over the edges
+        total_value_wei, top_paths = await self._analyze_flows()
+        total_value = _wei_to_eth(total_value_wei)
+        
+        # Save nodes, edges and results to database in one transaction
+        nodes, edges = self._collect_graph_rows()
+        logger.debug("Persisting graph to database", nodes=len(nodes), edges=len(edges))
+        await self.graph_repo.finalize_graph(
             self.incident_id,
+            nodes,
+            edges,
             total_nodes=total_nodes,
             total_edges=total_edges,
             max_depth=max_depth,
-            total_value_traced=str(total_value),
+            total_value_traced=total_value,
             processing_time=processing_time,
             api_calls_used=self.api_calls_used,
             endpoint_summary=dict(endpoint_summary),
             top_paths=top_paths
         )
         
-        # Save all nodes and edges to database
-        await self._persist_graph_to_database()
-        
         return {
             "status": "completed",
             "total_nodes": total_nodes,
             "total_edges": total_edges,
             "max_depth": max_depth,
-            "total_value_traced": str(total_value),
+            "total_value_traced": total_value,
             "processing_time_seconds": processing_time,
             "api_calls_used": self.api_calls_used,
             "endpoint_summary": dict(endpoint_summary),
             "top_paths": top_paths
         }
     
-    async def _generate_top_paths(self) -> List[Dict[str, Any]]:
-        """Generate list of top transaction paths by value."""
-        paths = []
-        
-        # Simple implementation: find high-value direct paths
-        for edge in self.graph.edges(data=True):
-            from_addr, to_addr, edge_data = edge
-            value_eth = float(edge_data.get("value_eth", 0))
-            
-            if value_eth > 0.1:  # Only significant values
-                from_type = self.graph.nodes[from_addr].get("entity_type", "Unknown") 
-                to_type = self.graph.nodes[to_addr].get("entity_type", "Unknown")
-                
-                path = {
-                    "path_id": len(paths) + 1,
-                    "value_eth": str(value_eth),
-                    "value_percentage": edge_data.get("flow_percentage", 0),
-                    "hop_count": 1,  # Direct path
-                    "final_endpoint_type": to_type,
-                    "final_endpoint_confidence": self.graph.nodes[to_addr].get("confidence_score", 0)
-                }
-                paths.append(path)
-        
-        # Sort by value and return top 10
-        paths.sort(key=lambda p: float(p["value_eth"]), reverse=True)
-        return paths[:10]
-    
-    async def _persist_graph_to_database(self):
-        """Save all graph nodes and edges to database."""
-        logger.debug("Persisting graph to database")
-        
-        # Save nodes
-        for node_address in self.graph.nodes():
-            node_data = self.graph.nodes[node_address]
-            
-            await self.graph_repo.insert_graph_node(
-                self.incident_id,
-                node_address,
-                entity_type=node_data.get("entity_type", "Unknown"),
-                confidence_score=node_data.get("confidence_score", 0.0),
-                depth_from_hack=node_data.get("depth_from_hack", 0),
-                balance_eth=node_data.get("balance_eth", 0),
-                transaction_count=node_data.get("transaction_count", 0),
-                first_seen=node_data.get("first_seen"),
-                endpoint_type=node_data.get("endpoint_type", "Unknown"),
-                termination_reason=node_data.get("termination_reason"),
-                manual_exploration_ready=node_data.get("manual_exploration_ready", False),
-                attributes=node_data.get("attributes", {})
-            )
+    def _collect_graph_rows(self) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+        """Collect graph nodes and edges as rows for bulk persistence."""
+        # Collect nodes
+        nodes = []
+        for node_address, node_data in self.graph.nodes(data=True):
+            nodes.append({
+                "address": node_address,
+                "entity_type": node_data.get("entity_type", "Unknown"),
+                "confidence_score": node_data.get("confidence_score", 0.0),
+                "depth_from_hack": node_data.get("depth_from_hack", 0),
+                "balance_eth": node_data.get("balance_eth", 0),
+                "transaction_count": node_data.get("transaction_count", 0),
+                "first_seen": node_data.get("first_seen"),
+                "endpoint_type": node_data.get("endpoint_type", "Unknown"),
+                "termination_reason": node_data.get("termination_reason"),
+                "manual_exploration_ready": node_data.get("manual_exploration_ready", False),
+                "attributes": node_data.get("attributes", {})
+            })
         
-        # Save edges
+        # Collect edges
+        edges = []
         for from_addr, to_addr, edge_data in self.graph.edges(data=True):
-            await self.graph_repo.insert_graph_edge(
-                self.incident_id,
-                from_addr,
-                to_addr,
-                edge_data.get("transaction_hash", ""),
-                edge_data.get("value_eth", "0"),
-                priority_score=edge_data.get("priority_score", 0),
-                block_number=edge_data.get("block_number"),
-                timestamp=edge_data.get("timestamp"), 
-                gas_used=edge_data.get("gas_used"),
-                gas_price=edge_data.get("gas_price"),
-                filter_reason=edge_data.get("filter_reason"),
-                attributes=edge_data.get("attributes", {})
-            )
+            edges.append({
+                "from_address": from_addr,
+                "to_address": to_addr,
+                "transaction_hash": edge_data.get("transaction_hash", ""),
+                "value_eth": _wei_to_eth(edge_data.get("value_wei", 0)),
+                "priority_score": edge_data.get("priority_score", 0),
+                "block_number": edge_data.get("block_number"),
+                "timestamp": edge_data.get("timestamp"),
+                "gas_used": edge_data.get("gas_used"),
+                "gas_price": edge_data.get("gas_price"),
+                "filter_reason": edge_data.get("filter_reason"),
+                "attributes": edge_data.get("attributes", {})
+            })
         
-        logger.debug("Graph persisted to database successfully")
+        return nodes, edges
     
     async def _get_total_stolen_amount(self) -> float:
-        """Get the total stolen amount from the incident."""
-        # For now, return a placeholder - would need to calculate from transaction details
-        return 100.0  # ETH
+        """Get the total stolen amount from the incident (computed once per run)."""
+        if self._total_stolen is None:
+            # For now, use a placeholder - would need to calculate from transaction details
+            self._total_stolen = 100.0  # ETH
+        return self._total_stolen
     
-    async def _add_graph_node(self, address: str, depth: int = 0, **kwargs):
+    def _add_graph_node(self, address: str, depth: int = 0, **kwargs):
         """Add a node to the graph with given attributes."""
         self.graph.add_node(address, depth_from_hack=depth, **kwargs)
         
-    async def _add_graph_edge(self, from_addr: str, to_addr: str, tx_hash: str, value: str, **kwargs):
-        """Add an edge to the graph with transaction data."""
+    def _add_graph_edge(self, from_addr: str, to_addr: str, tx_hash: str, value_wei: int, **kwargs):
+        """Add an edge to the graph with transaction data; the value is kept in wei."""
         self.graph.add_edge(from_addr, to_addr, 
                           transaction_hash=tx_hash,
-                          value_eth=value,
+                          value_wei=value_wei,
                           **kwargs)
     
     # Error handling methods
     async def _handle_timeout(self) -> Dict[str, Any]:
         """Handle processing timeout."""
-        processing_time = int(time.time() - self.processing_start_time)
-        
-        partial_results = {
-            "total_nodes": self.graph.number_of_nodes() if self.graph else 0,
-            "total_edges": self.graph.number_of_edges() if self.graph else 0,
-            "max_depth": 0
-        }
+        partial_results = self._partial_results()
+        response = self._build_error_response(
+            "timeout", "Processing timeout after 30 seconds", partial_results=partial_results
+        )
         
         await self.graph_repo.update_graph_status(
             self.incident_id,
@@ -712,27 +832,18 @@ class GraphMappingService:
             partial_results=partial_results
         )
         
-        return {
-            "status": "timeout",
-            "message": "Processing timeout after 30 seconds", 
-            "processing_time_seconds": processing_time,
-            "api_calls_used": self.api_calls_used,
-            "partial_results": partial_results
-        }
+        return response
     
     async def _handle_etherscan_error(self, error: Exception) -> Dict[str, Any]:
         """Handle Etherscan API errors."""
-        processing_time = int(time.time() - self.processing_start_time) 
-        
         error_code = "ETHERSCAN_API_ERROR"
         if isinstance(error, EtherscanRateLimitError):
             error_code = "ETHERSCAN_API_LIMIT"
         
-        partial_results = {
-            "total_nodes": self.graph.number_of_nodes() if self.graph else 0,
-            "total_edges": self.graph.number_of_edges() if self.graph else 0,
-            "max_depth": 0
-        }
+        partial_results = self._partial_results()
+        response = self._build_error_response(
+            "error", str(error), error_code=error_code, partial_results=partial_results
+        )
         
         await self.graph_repo.update_graph_status(
             self.incident_id,
@@ -742,18 +853,11 @@ class GraphMappingService:
             partial_results=partial_results
         )
         
-        return {
-            "status": "error",
-            "error_code": error_code,
-            "message": str(error),
-            "processing_time_seconds": processing_time,
-            "api_calls_used": self.api_calls_used,
-            "partial_results": partial_results
-        }
+        return response
     
     async def _handle_general_error(self, error: Exception) -> Dict[str, Any]:
         """Handle general processing errors."""
-        processing_time = int(time.time() - self.processing_start_time)
+        response = self._build_error_response("error", str(error), error_code="INTERNAL_ERROR")
         
         await self.graph_repo.update_graph_status(
             self.incident_id,
@@ -762,10 +866,30 @@ class GraphMappingService:
             error_code="INTERNAL_ERROR"
         )
         
+        return response
+    
+    def _partial_results(self) -> Dict[str, Any]:
+        """Summarize the graph built so far for early-terminated runs."""
         return {
-            "status": "error",
-            "error_code": "INTERNAL_ERROR",
-            "message": str(error),
-            "processing_time_seconds": processing_time,
-            "api_calls_used": self.api_calls_used
+            "total_nodes": self.graph.number_of_nodes() if self.graph else 0,
+            "total_edges": self.graph.number_of_edges() if self.graph else 0,
+            "max_depth": 0
         }
+    
+    def _build_error_response(
+        self,
+        status: str,
+        message: str,
+        error_code: Optional[str] = None,
+        partial_results: Optional[Dict[str, Any]] = None
+    ) -> Dict[str, Any]:
+        """Build the result returned when processing stops early."""
+        response: Dict[str, Any] = {"status": status}
+        if error_code is not None:
+            response["error_code"] = error_code
+        response["message"] = message
+        response["processing_time_seconds"] = int(time.monotonic() - self.processing_start_time)
+        response["api_calls_used"] = self.api_calls_used
+        if partial_results:
+            response["partial_results"] = partial_results
+        return response
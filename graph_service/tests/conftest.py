@@ -0,0 +1,40 @@
+"""Shared fixtures for the Graph Mapping Service tests."""
+
+import importlib
+import os
+
+import pytest
+
+# Settings the service requires at import but the tests never connect with
+REQUIRED_ENV = {
+    "DATABASE_URL": "postgresql://localhost/test",
+    "ETHERSCAN_API_KEY": "test",
+}
+
+
+@pytest.fixture(scope="session", autouse=True)
+def service_env():
+    """Provide the required settings unless the environment already sets them."""
+    with pytest.MonkeyPatch.context() as mp:
+        for name, value in REQUIRED_ENV.items():
+            if name not in os.environ:
+                mp.setenv(name, value)
+        yield
+
+
+@pytest.fixture
+def config_module():
+    """app.config, imported once the required settings are present."""
+    return importlib.import_module("app.config")
+
+
+@pytest.fixture
+def etherscan_module():
+    """app.services.etherscan, imported once the required settings are present."""
+    return importlib.import_module("app.services.etherscan")
+
+
+@pytest.fixture
+def graph_module():
+    """app.services.graph, imported once the required settings are present."""
+    return importlib.import_module("app.services.graph")
@@ -0,0 +1,163 @@
+"""Tests for graph initialization and node fetching in the Graph Mapping Service."""
+
+import asyncio
+import heapq
+import time
+
+import networkx as nx
+import pytest
+
+VICTIM = "0x" + "a" * 40
+HACKER = "0x" + "b" * 40
+
+
+class FakeIncidentRepository:
+    """Serves one incident and its hack transaction."""
+
+    def __init__(self, value: str):
+        self.value = value
+
+    async def get_incident_by_id(self, incident_id):
+        return {"wallet_address": VICTIM}
+
+    async def get_incident_transaction_details(self, incident_id):
+        return [{"to_address": HACKER, "transaction_hash": "0xhack", "value": self.value}]
+
+
+class FakeGraphRepository:
+    """Accepts progress writes."""
+
+    async def update_graph_status(self, incident_id, status, **fields):
+        pass
+
+
+@pytest.fixture
+def fake_etherscan(etherscan_module):
+    """Build an Etherscan service serving full pages of small outgoing transfers."""
+
+    class FakeEtherscanService(etherscan_module.EtherscanService):
+        """Paging never finds enough candidates; pages from fail_from_page on raise."""
+
+        def __init__(self, fail_from_page=None):
+            super().__init__()
+            self.fail_from_page = fail_from_page
+            self.requests = 0
+
+        async def get_account_transactions(self, address, start_block=0, end_block=99999999,
+                                           page=1, offset=50, sort="asc"):
+            self.requests += 1
+            await asyncio.sleep(0)
+            if self.fail_from_page is not None and page >= self.fail_from_page:
+                raise etherscan_module.EtherscanError("upstream unavailable")
+            return [
+                {"from": address, "to": HACKER, "value": hex(10 ** 15), "hash": f"0x{page}{i}"}
+                for i in range(offset)
+            ]
+
+    return FakeEtherscanService
+
+
+@pytest.fixture
+def make_service(config_module, graph_module):
+    """Build a graph service for fetching nodes under the given limit overrides."""
+
+    def make(etherscan, **limits):
+        limits = {**config_module.settings.processing_limits, **limits}
+        service = graph_module.GraphMappingService(
+            None, FakeGraphRepository(), etherscan, None, limits=limits
+        )
+        service.graph = nx.DiGraph()
+        service.processing_start_time = time.monotonic()
+        return service
+
+    return make
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("value, expected_wei", [
+    ("1500000000000000000", 1_500_000_000_000_000_000),
+    ("1e+21", 10 ** 21),  # Node ingest prints 1000 ETH and above in exponent form
+    ("2.5e+22", 25 * 10 ** 21),
+    (None, 0),
+])
+async def test_initial_hack_edge_parses_wei_value(graph_module, value, expected_wei):
+    service = graph_module.GraphMappingService(FakeIncidentRepository(value), None, None, None)
+    service.incident_id = "incident"
+
+    await service._initialize_graph()
+
+    assert service.graph.edges[VICTIM, HACKER]["value_wei"] == expected_wei
+
+
+@pytest.mark.asyncio
+async def test_concurrent_node_fetches_stay_within_api_budget(fake_etherscan, make_service):
+    etherscan = fake_etherscan()
+    service = make_service(etherscan, max_api_calls=7, max_pages_per_node=3)
+    addresses = [f"0x{i:040x}" for i in range(5)]
+
+    fetched = await asyncio.gather(*(service._fetch_node_transactions(a, 1) for a in addresses))
+
+    assert etherscan.requests == service.api_calls_used == 7
+    # Classification still sees one page per node, however many pages were read
+    assert all(first_page_count == 50 for _, first_page_count in filter(None, fetched))
+
+
+@pytest.mark.asyncio
+async def test_later_page_failure_keeps_pages_already_fetched(fake_etherscan, make_service):
+    etherscan = fake_etherscan(fail_from_page=2)
+    service = make_service(etherscan, max_api_calls=10, max_pages_per_node=3)
+
+    fetched = await service._fetch_node_transactions("0x" + "c" * 40, 1)
+
+    assert fetched is not None
+    transactions, first_page_count = fetched
+    assert len(transactions) == first_page_count == 50
+    assert etherscan.requests == service.api_calls_used == 2
+
+
+@pytest.mark.asyncio
+async def test_first_page_failure_drops_node(fake_etherscan, make_service):
+    etherscan = fake_etherscan(fail_from_page=1)
+    service = make_service(etherscan, max_api_calls=10, max_pages_per_node=3)
+
+    assert await service._fetch_node_transactions("0x" + "c" * 40, 1) is None
+    assert etherscan.requests == service.api_calls_used == 1
+
+
+@pytest.mark.asyncio
+async def test_traversal_tolerates_zero_page_and_fan_out_limits(fake_etherscan, make_service):
+    etherscan = fake_etherscan()
+    service = make_service(etherscan, max_pages_per_node=0, max_transactions_per_node=0)
+    for i in range(2):
+        heapq.heappush(service.pending_nodes, (-100, 1, f"0x{i:040x}"))
+
+    await service._recursive_traversal()
+
+    assert service.nodes_processed == 2
+    assert etherscan.requests == service.api_calls_used == 0
+
+
+@pytest.mark.asyncio
+async def test_unexpected_fetch_error_cancels_sibling_fetches(fake_etherscan, make_service):
+    failing = "0x" + "f" * 40
+    cancelled = []
+
+    class StallingEtherscanService(fake_etherscan):
+        async def get_account_transactions(self, address, *args, **kwargs):
+            if address == failing:
+                raise RuntimeError("unexpected")
+            try:
+                await asyncio.Event().wait()
+            except asyncio.CancelledError:
+                cancelled.append(address)
+                raise
+
+    service = make_service(StallingEtherscanService())
+    siblings = [f"0x{i:040x}" for i in range(3)]
+    for address in [failing, *siblings]:
+        heapq.heappush(service.pending_nodes, (-100, 1, address))
+
+    with pytest.raises(RuntimeError):
+        await service._recursive_traversal()
+
+    assert sorted(cancelled) == siblings